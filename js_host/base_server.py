@@ -1,10 +1,14 @@
 import json
 import requests
+import types
 import warnings
-from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+from . import log
 from .conf import settings
 from .utils import six, verbosity
-from .exceptions import ConfigError, ConnectionError, UnexpectedResponse
+from .exceptions import ConfigError, ConnectionError
+from .http_cache import HTTPCache
 
 
 class BaseServer(object):
@@ -18,6 +22,18 @@ class BaseServer(object):
 
     has_connected = False
 
+    # A requests session which holds a pool of persistent connections
+    session = None
+
+    # Overrides the PERSISTENT_CONNECTIONS setting
+    persistent_connections = None
+
+    # Overrides the CONNECTION_POOL_SIZE setting
+    connection_pool_size = None
+
+    # Caches responses according to their Cache-Control and ETag headers
+    http_cache = None
+
     def __init__(self, status, config_file=None, root_url=None):
         self.status = status
 
@@ -25,7 +41,7 @@ class BaseServer(object):
             self.config_file = config_file
 
         if root_url is not None:
-            self.root_url = settings.get_root_url()
+            self.root_url = root_url
 
         self.validate_status()
 
@@ -38,6 +54,13 @@ class BaseServer(object):
 
         return '{} [{}]'.format(type(self).__name__, url)
 
+    def can_restart(self):
+        """
+        Indicates whether `restart` can be called, as servers which were started
+        externally must be restarted manually
+        """
+        return False
+
     def get_status(self):
         return self.status
 
@@ -66,39 +89,115 @@ class BaseServer(object):
             endpoint=endpoint or '',
         )
 
-    def send_request(self, endpoint, post=None, params=None, headers=None, data=None, timeout=None, unsafe=None):
+    def get_session(self):
+        if self.session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=self.connection_pool_size or settings.CONNECTION_POOL_SIZE,
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self.session = session
+
+        return self.session
+
+    def get_http_cache(self):
+        if self.http_cache is None and settings.HTTP_CACHE_SIZE:
+            self.http_cache = HTTPCache(settings.HTTP_CACHE_SIZE)
+
+        return self.http_cache
+
+    def get_cache_entry(self, cache_key):
+        """
+        Returns the HTTP cache's entry for `cache_key`, or None
+        """
+        http_cache = self.get_http_cache()
+        if http_cache is not None and cache_key is not None:
+            return http_cache.get(cache_key)
+
+    def clear_http_cache(self):
+        if self.http_cache is not None:
+            self.http_cache.clear()
+
+    def send_request(self, endpoint=None, post=None, params=None, headers=None, data=None, timeout=None, unsafe=None,
+                     url=None, stream=False, cache_key=None, cache_entry=None, read=None):
+        """
+        Sends a request to the server. If `cache_key` is provided, the response
+        is stored in the HTTP cache, and a stale `cache_entry` - as looked up
+        by the caller with `get_cache_entry` - is revalidated with its ETag.
+
+        If `read` is provided, the response is streamed and passed to it, and
+        the response that it returns - with the body read - is used instead
+        """
         if not unsafe and not self.has_connected:
             raise ConnectionError(
                 '{name} has not opened a connection yet. Call `connect()`'.format(name=self.get_name())
             )
 
-        url = self.get_url(endpoint)
+        if url is None:
+            url = self.get_url(endpoint)
 
-        func = requests.post if post else requests.get
+        # Responses streamed to the caller have not been read, so they are never
+        # cached. Responses passed to `read` are cached once they have been read
+        http_cache = None
+        if cache_key is not None and not stream:
+            http_cache = self.get_http_cache()
+
+        if http_cache is not None:
+            headers = http_cache.get_conditional_headers(cache_entry, headers)
+
+        persistent_connections = self.persistent_connections
+        if persistent_connections is None:
+            persistent_connections = settings.PERSISTENT_CONNECTIONS
+
+        if persistent_connections:
+            requester = self.get_session()
+        else:
+            requester = requests
+
+        func = requester.post if post else requester.get
 
         kwargs = {
             'params': params,
             'headers': headers,
-            'timeout': timeout
+            'timeout': timeout,
+            'stream': stream or read is not None,
         }
         if post:
             kwargs['data'] = data
 
-        return func(url, **kwargs)
+        res = func(url, **kwargs)
+
+        if read is not None:
+            res = read(res)
+
+        if http_cache is not None:
+            return http_cache.handle_response(cache_key, res, cache_entry)
+
+        return res
 
     def send_json_request(self, *args, **kwargs):
         kwargs['post'] = True
         kwargs['headers'] = {'content-type': 'application/json'}
 
-        if 'data' in kwargs and not isinstance(kwargs['data'], six.string_types):
+        # Serialized data and generators of chunks are sent as they are
+        if 'data' in kwargs and not isinstance(kwargs['data'], six.string_types + (types.GeneratorType,)):
             kwargs['data'] = json.dumps(kwargs['data'])
 
         return self.send_request(*args, **kwargs)
 
-    def request_status(self):
+    def request_status(self, timeout=None):
+        """
+        Returns the status reported by the server, or None if it does not
+        respond within `timeout` seconds, which defaults to STATUS_TIMEOUT
+        """
+        if timeout is None:
+            timeout = settings.STATUS_TIMEOUT
+
         try:
-            res = self.send_request('status', unsafe=True)
-        except RequestsConnectionError:
+            res = self.send_request('status', unsafe=True, timeout=timeout)
+        except (RequestsConnectionError, Timeout):
             return
 
         try:
@@ -106,9 +205,30 @@ class BaseServer(object):
         except ValueError:
             return None
 
-    def is_running(self):
+    def has_stopped(self):
+        """
+        Indicates that nothing is listening at the server's address. Listeners
+        which accept connections but do not respond have not stopped
+        """
+        try:
+            self.send_request('status', unsafe=True, timeout=settings.STATUS_TIMEOUT)
+        except Timeout:
+            # Checked first, as connect timeouts are also connection errors
+            return False
+        except RequestsConnectionError:
+            return True
+        return False
+
+    def is_running(self, warn=True):
+        return self.matches_status(self.request_status(), warn=warn)
+
+    def matches_status(self, actual_status, warn=True):
+        """
+        Indicates if a status reported by a remote server matches this
+        server's status. Unless `warn` is False, a warning is raised if the
+        remote server is using a different version
+        """
         expected_status = self.get_status()
-        actual_status = self.request_status()
 
         if not actual_status:
             return False
@@ -116,7 +236,7 @@ class BaseServer(object):
         if expected_status == actual_status:
             return True
 
-        if 'version' in actual_status and 'version' in expected_status:
+        if warn and 'version' in actual_status and 'version' in expected_status:
             expected_version = expected_status['version']
             actual_version = actual_status['version']
             if expected_version != actual_version:
@@ -154,24 +274,11 @@ class BaseServer(object):
             raise ConfigError('No port has been defined in {}'.format(config))
 
     def connect(self):
-        if not self.is_running():
+        # A single request both checks that the server is running and that
+        # its status matches our own
+        if not self.matches_status(self.request_status(settings.STARTUP_TIMEOUT)):
             raise ConnectionError('Cannot connect to {}'.format(self.get_name()))
 
-        local = self.get_status()
-        remote = self.request_status()
-
-        if remote != local:
-            raise UnexpectedResponse(
-                (
-                    'Cannot complete connection due to differences in local status and remote status. '
-                    'Local: {local}. Remote: {remote}.'
-                ).format(
-                    local=local,
-                    remote=remote,
-                )
-            )
-
-        if settings.VERBOSITY >= verbosity.CONNECT:
-            print('Connected to {}'.format(self.get_name()))
+        log.log(verbosity.CONNECT, 'Connected to %s', self.get_name(), event='connected', host=self.get_name())
 
         self.has_connected = True
\ No newline at end of file
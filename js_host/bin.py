@@ -2,16 +2,19 @@
 
 import subprocess
 import json
+from . import log
 from .conf import settings
 from .exceptions import ConfigError, ProcessError
 from .utils import verbosity
+from .utils.background import BackgroundCall
+from .utils.polling import wait_for
+from .sampling import sampled
 from .manager import JSHostManager
 from .js_host import JSHost
 
 
 def read_status_from_config_file(config_file, extra_args=None):
-    if settings.VERBOSITY >= verbosity.VERBOSE:
-        print('Reading config file {}'.format(config_file))
+    log.log(verbosity.VERBOSE, 'Reading config file %s', config_file, event='reading_config', config_file=config_file)
 
     cmd = (settings.PATH_TO_NODE, settings.get_path_to_bin(), config_file, '--config',)
 
@@ -19,18 +22,17 @@ def read_status_from_config_file(config_file, extra_args=None):
         cmd += extra_args
 
     process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    process.wait()
+    stdout, stderr = process.communicate()
 
-    stderr = process.stderr.read()
     if stderr:
         raise ConfigError(stderr)
 
-    stdout = process.stdout.read()
     stdout = stdout.decode('utf-8')
 
     return json.loads(stdout)
 
 
+@sampled
 def spawn_detached_manager(config_file, status=None):
     if status is None:
         status = read_status_from_config_file(config_file, extra_args=('--manager',))
@@ -42,9 +44,23 @@ def spawn_detached_manager(config_file, status=None):
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
     )
-    process.wait()
 
-    stderr = process.stderr.read()
+    # The child exits once the detached manager has been spawned. Its pipes are
+    # drained while waiting, as a child which fills a pipe's buffer would
+    # otherwise block and never exit
+    communicate = BackgroundCall(process.communicate)
+    communicate.start()
+    communicate.join(settings.STARTUP_TIMEOUT)
+
+    if communicate.is_alive():
+        process.kill()
+        communicate.join()
+        raise ProcessError(
+            'Timed out after {} seconds while spawning {}'.format(settings.STARTUP_TIMEOUT, manager.get_name())
+        )
+
+    stdout, stderr = communicate.join()
+
     if stderr:
         if 'EADDRINUSE' in str(stderr):
             raise ProcessError(
@@ -56,7 +72,6 @@ def spawn_detached_manager(config_file, status=None):
             )
         raise ProcessError(stderr)
 
-    stdout = process.stdout.read()
     stdout = stdout.decode('utf-8')
 
     new_status = json.loads(stdout)
@@ -64,22 +79,33 @@ def spawn_detached_manager(config_file, status=None):
     manager.status = new_status
     manager.validate_status()
 
-    if not manager.is_running():
+    # Poll until the manager is accepting requests, rather than assuming it is
+    # ready. Only the final check warns if the manager's version differs
+    if not wait_for(lambda: manager.is_running(warn=False), settings.STARTUP_TIMEOUT) and not manager.is_running():
         raise ProcessError('Started {}, but cannot connect'.format(manager.get_name()))
 
-    if settings.VERBOSITY >= verbosity.PROCESS_START:
-        print('Started {}'.format(manager.get_name()))
+    log.log(verbosity.PROCESS_START, 'Started %s', manager.get_name(), event='manager_started', host=manager.get_name())
 
     manager.connect()
 
     return manager
 
 
+@sampled
 def spawn_managed_host(config_file, manager, connect_on_start=True):
     """
     Spawns a managed host, if it is not already running
     """
+    host, started = start_managed_host(config_file, manager, connect_on_start)
+    return host
 
+
+@sampled
+def start_managed_host(config_file, manager, connect_on_start=True):
+    """
+    Returns a tuple of a managed host and a boolean which indicates if the
+    host was started by this call, rather than already running
+    """
     data = manager.request_host_status(config_file)
 
     is_running = data['started']
@@ -100,10 +126,62 @@ def spawn_managed_host(config_file, manager, connect_on_start=True):
         manager=manager
     )
 
-    if not is_running and settings.VERBOSITY >= verbosity.PROCESS_START:
-        print('Started {}'.format(host.get_name()))
+    if not is_running:
+        log.log(verbosity.PROCESS_START, 'Started %s', host.get_name(), event='host_started', host=host.get_name())
 
     if connect_on_start:
-        host.connect()
+        try:
+            host.connect()
+        except Exception:
+            if not is_running:
+                stop_started_host(host)
+            raise
+
+    return host, not is_running
+
+
+@sampled
+def spawn_managed_hosts(config_files, manager, connect_on_start=True):
+    """
+    Spawns managed hosts for multiple config files. The requests for each host
+    are sent to the manager concurrently over its pool of persistent
+    connections, so spawning many hosts costs about as many round-trips as
+    spawning one.
 
-    return host
\ No newline at end of file
+    If any host fails to spawn, the hosts which were started by this call are
+    stopped before the error is raised
+    """
+    calls = [
+        BackgroundCall(start_managed_host, config_file, manager, connect_on_start)
+        for config_file in config_files
+    ]
+
+    for call in calls:
+        call.start()
+
+    results = []
+    error = None
+    for call in calls:
+        try:
+            results.append(call.join())
+        except Exception as e:
+            error = error or e
+
+    if error is not None:
+        for host, started in results:
+            if started:
+                stop_started_host(host)
+        raise error
+
+    return [host for host, started in results]
+
+
+def stop_started_host(host):
+    """
+    Stops a host which was started by a spawn that failed. Failures to stop
+    it are logged, so that they do not hide the spawn's error
+    """
+    try:
+        host.stop()
+    except Exception as e:
+        log.warn('Failed to stop %s: %s', host.get_name(), e, event='host_stop_failed', host=host.get_name())
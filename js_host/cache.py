@@ -0,0 +1,158 @@
+import collections
+import json
+import threading
+import time
+from .conf import settings
+from .trace import read_trace
+from .utils.priority import BACKGROUND
+
+
+class ResultCache(object):
+    """
+    A thread-safe, in-memory cache of function output, which evicts the least
+    recently used entries once it holds `max_entries`. Entries older than
+    `max_age` seconds are treated as missing.
+
+    If `stale_window` is set, entries remain usable for that many seconds
+    after they expire. Functions serve these stale entries immediately while
+    a single background call refreshes them.
+
+    Assign an instance to a function's `cache` attribute to cache the output
+    of its `call` method.
+    """
+
+    def __init__(self, max_entries=1000, max_age=None, stale_window=None):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.stale_window = stale_window
+        self.lock = threading.Lock()
+        # Maps keys to (value, stored_at) tuples, from the least to the most
+        # recently used
+        self.entries = collections.OrderedDict()
+        # Keys of stale entries which are being refreshed
+        self.refreshing = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the value stored for `key`, or None if there is no fresh entry
+        """
+        value, should_refresh = self.find(key, allow_stale=False)
+        return value
+
+    def lookup(self, key):
+        """
+        Returns a `(value, should_refresh)` tuple. Stale entries within the
+        stale window are returned, and `should_refresh` is True for the first
+        caller to find each stale entry, which is expected to refresh it by
+        calling `set`, or `cancel_refresh` if the refresh fails
+        """
+        return self.find(key, allow_stale=True)
+
+    def find(self, key, allow_stale):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+
+            age = None
+            if entry is not None:
+                age = time.time() - entry[1]
+
+            if entry is None or not self.is_usable(age, allow_stale):
+                self.misses += 1
+                return None, False
+
+            # Reinserting marks the entry as the most recently used
+            self.entries[key] = entry
+
+            if self.max_age is None or age <= self.max_age:
+                self.hits += 1
+                return entry[0], False
+
+            self.stale_hits += 1
+            should_refresh = key not in self.refreshing
+            self.refreshing.add(key)
+
+            return entry[0], should_refresh
+
+    def is_usable(self, age, allow_stale):
+        if self.max_age is None:
+            return True
+
+        max_age = self.max_age
+        if allow_stale and self.stale_window is not None:
+            max_age += self.stale_window
+
+        return age <= max_age
+
+    def set(self, key, value):
+        with self.lock:
+            self.refreshing.discard(key)
+            self.entries.pop(key, None)
+            self.entries[key] = (value, time.time())
+
+            while len(self.entries) > self.max_entries:
+                evicted_key, evicted_entry = self.entries.popitem(last=False)
+                self.refreshing.discard(evicted_key)
+
+    def cancel_refresh(self, key):
+        with self.lock:
+            self.refreshing.discard(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.refreshing.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_metrics(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+            }
+
+
+def warm(functions, trace_file=None, limit=100, concurrency=None):
+    """
+    Calls the `limit` most frequent calls recorded in `trace_file` and stores
+    their output in the caches of `functions`, so that a process can be warmed
+    before it serves traffic. Only calls to functions with caches, and whose
+    data was recorded, are replayed.
+
+    Returns the number of entries which were stored
+    """
+    functions = dict((function.name, function) for function in functions if function.cache is not None)
+
+    entries = [
+        entry for entry in read_trace(trace_file or settings.TRACE_FILE)
+        if entry.name in functions and entry.data is not None
+    ][:limit]
+
+    calls = collections.OrderedDict()
+    for entry in entries:
+        calls.setdefault(entry.name, []).append(entry)
+
+    stored = 0
+    for name, function_entries in calls.items():
+        function = functions[name]
+
+        # Warming should not compete with any calls which are already being served
+        results = function.map(
+            (json.loads(entry.data) for entry in function_entries),
+            concurrency=concurrency,
+            priority=BACKGROUND,
+        )
+
+        for entry, (kwargs, output, error) in zip(function_entries, results):
+            if error is None:
+                function.cache.set((name, entry.hash), output)
+                stored += 1
+
+    return stored
@@ -4,6 +4,28 @@ from optional_django import conf
 from .utils.verbosity import PROCESS_START
 from .exceptions import ConfigError
 
+TRANSPORTS = ('http', 'stream')
+
+
+def validate_host_settings(root_url, use_manager, use_stdio):
+    """
+    Raises ConfigError if the settings used to reach a host can not be combined
+    """
+    if root_url:
+        if use_manager:
+            raise ConfigError(
+                'The ROOT_URL can not defined if USE_MANAGER is set to True. If you want to run a manager at a '
+                'different address or port, you should define the `address` and `port` properties in your config '
+                'file'
+            )
+        if root_url.endswith('/'):
+            raise ConfigError(
+                'The ROOT_URL must not end in a slash. It should be an address in the format http://127.0.0.1:8000'
+            )
+
+    if use_stdio and (use_manager or root_url):
+        raise ConfigError('USE_STDIO can not be combined with USE_MANAGER or ROOT_URL')
+
 
 class Conf(conf.Conf):
     # An absolute path to the directory which contains your node_modules directory
@@ -13,10 +35,24 @@ class Conf(conf.Conf):
     # Relative paths are joined to SOURCE_ROOT
     CONFIG_FILE = 'host.config.js'
 
+    # Named hosts which can be used alongside the default host. Each name maps to a
+    # dict which must define CONFIG_FILE and can override ROOT_URL, USE_MANAGER,
+    # USE_STDIO, STDIO_POOL_SIZE, FUNCTION_TIMEOUT, CONNECTION_POOL_SIZE,
+    # CONCURRENCY_LIMIT and REQUEST_SPOOL_THRESHOLD for that host
+    HOSTS = {}
+
     # Indicates that a manager should be used to spawn host instances
     # DO *NOT* USE THE MANAGER IN PRODUCTION
     USE_MANAGER = False
 
+    # Indicates that hosts should run as child processes which communicate over
+    # their stdin and stdout, rather than over the network
+    USE_STDIO = False
+
+    # The number of child processes spawned by stdio hosts. Defaults to the
+    # number of CPUs
+    STDIO_POOL_SIZE = None
+
     # A path that will resolve to a node binary
     PATH_TO_NODE = 'node'
 
@@ -27,6 +63,99 @@ class Conf(conf.Conf):
     # How long functions will wait for a response before raising errors
     FUNCTION_TIMEOUT = 10.0  # 10 seconds
 
+    # If True, requests to hosts and managers are sent over persistent keep-alive
+    # connections. If False, a new connection is opened for every request
+    PERSISTENT_CONNECTIONS = True
+
+    # The maximum number of persistent connections kept open to each host or manager
+    CONNECTION_POOL_SIZE = 10
+
+    # How function calls are sent to hosts. 'http' sends a request per call.
+    # 'stream' multiplexes calls over one connection to the stream server at the
+    # `streamPort` in the host's config file, and falls back to 'http' if the
+    # server can not be reached
+    TRANSPORT = 'http'
+
+    # How long to wait for managers and hosts to start before raising errors
+    STARTUP_TIMEOUT = 10.0  # 10 seconds
+
+    # How long to wait for managers and hosts to stop before raising errors
+    SHUTDOWN_TIMEOUT = 10.0  # 10 seconds
+
+    # How long each status request made while polling a manager or host waits
+    # for a response, so that a listener which never responds can not block
+    # the polls past their deadlines
+    STATUS_TIMEOUT = 1.0  # 1 second
+
+    # The largest serialized data, in bytes, that will be sent to a function, and
+    # the largest output that will be read from one. None disables the limits
+    MAX_REQUEST_SIZE = None
+    MAX_RESPONSE_SIZE = None
+
+    # If set, data sent to functions is serialized incrementally into a temporary
+    # file which spills to disk beyond this many bytes, and is uploaded in chunks.
+    # None serializes data in memory, which is faster for small payloads. Spooling
+    # is slower, so it is best enabled only for the hosts or functions which
+    # receive very large payloads
+    REQUEST_SPOOL_THRESHOLD = None
+
+    # The output returned by `Function.call_file` is held in memory up to this many
+    # bytes, and spilled to a temporary file beyond it. None holds it in memory
+    RESPONSE_SPOOL_THRESHOLD = 1024 * 1024
+
+    # If set, the responses of functions are cached according to the Cache-Control
+    # and ETag headers sent by hosts, holding up to this many responses per host
+    HTTP_CACHE_SIZE = None
+
+    # If True, the time spent in each phase of a call is recorded and passed to the
+    # listeners of `js_host.profiling.profiler`
+    PROFILE_CALLS = False
+
+    # If True, stack samples are taken from threads while they call functions or
+    # spawn processes, every SAMPLE_INTERVAL seconds. The samples are written to
+    # SAMPLE_FILE as collapsed stacks when the process exits
+    SAMPLE_CALLS = False
+    SAMPLE_INTERVAL = 0.005  # 5 milliseconds
+    SAMPLE_FILE = None
+
+    # If True, messages logged to the `js_host` logger are written to stdout. If
+    # False, they propagate to the handlers of your logging configuration
+    LOG_TO_STDOUT = True
+
+    # The share of function calls which are logged at the FUNCTION_CALL verbosity,
+    # and the number of characters of each call's data which are included
+    LOG_SAMPLE_RATE = 1.0
+    LOG_PAYLOAD_LIMIT = 200
+
+    # If set, every call to a function is appended to this file, so that the most
+    # frequent calls can be replayed by `js_host.cache.warm`
+    TRACE_FILE = None
+
+    # If True, the config file and the modules it loads are watched for changes,
+    # and managed or stdio hosts are restarted when they change
+    WATCH_CONFIG_FILES = False
+
+    # How often the watched files are checked for changes
+    WATCH_INTERVAL = 1.0  # 1 second
+
+    # The initial number of concurrent function calls allowed per host. The limit
+    # adapts to the latency of the host's responses. Set to None to disable limiting
+    CONCURRENCY_LIMIT = None
+
+    # The upper bound that the concurrency limit can grow to
+    CONCURRENCY_LIMIT_MAX = 100
+
+    # How many calls beyond the concurrency limit can wait for a host before
+    # HostOverloaded exceptions are raised
+    CONCURRENCY_QUEUE_SIZE = 100
+
+    # How long calls can wait for a host before HostOverloaded exceptions are raised
+    CONCURRENCY_QUEUE_TIMEOUT = 10.0  # 10 seconds
+
+    # The share of the concurrency limit which background calls can not use,
+    # so that capacity is always available for interactive calls
+    CONCURRENCY_INTERACTIVE_RESERVE = 0.25
+
     # If True, attempt to connect once js_host has been configured
     CONNECT_ONCE_CONFIGURED = True
 
@@ -41,20 +170,17 @@ class Conf(conf.Conf):
     _validated = {}
 
     def configure(self, **kwargs):
-        if self.ROOT_URL:
-            if self.USE_MANAGER:
-                raise ConfigError(
-                    'The ROOT_URL can not defined if USE_MANAGER is set to True. If you want to run a manager at a '
-                    'different address or port, you should define the `address` and `port` properties in your config '
-                    'file'
-                )
-            if self.ROOT_URL.endswith('/'):
-                raise ConfigError(
-                    'The ROOT_URL must not end in a slash. It should be an address in the format http://127.0.0.1:8000'
-                )
+        validate_host_settings(self.ROOT_URL, self.USE_MANAGER, self.USE_STDIO)
 
         super(Conf, self).configure(**kwargs)
 
+        validate_host_settings(self.ROOT_URL, self.USE_MANAGER, self.USE_STDIO)
+
+        if self.TRANSPORT not in TRANSPORTS:
+            raise ConfigError(
+                'TRANSPORT must be one of {}, not {}'.format(', '.join(map(repr, TRANSPORTS)), repr(self.TRANSPORT))
+            )
+
         if self.CONNECT_ONCE_CONFIGURED:
             # Ensure that we raise connection issues during startup, rather than runtime
             from .host import host
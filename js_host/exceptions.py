@@ -19,4 +19,12 @@ class UnexpectedResponse(Exception):
 
 
 class ProcessError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class HostOverloaded(Exception):
+    pass
+
+
+class PayloadTooLarge(Exception):
+    pass
@@ -1,11 +1,63 @@
+import contextlib
 import hashlib
 import json
+import logging
 import sys
+import tempfile
+import threading
+import time
 from optional_django.serializers import JSONEncoder
-from requests.exceptions import ConnectionError as RequestsConnectionError, ReadTimeout
+from requests.exceptions import (
+    ConnectionError as RequestsConnectionError, ChunkedEncodingError, ReadTimeout,
+)
+from . import log, profiling
 from .conf import settings
 from .utils import six, verbosity
-from .exceptions import ConfigError, FunctionError, UnexpectedResponse, ConnectionError, FunctionTimeout
+from .registry import get_host
+from .trace import get_trace
+from .profiling import CallProfile, parse_server_timing
+from .sampling import sampled
+from .utils.json_decoding import loads
+from .utils.priority import INTERACTIVE, BACKGROUND
+from .utils.response import ReadResponse
+from .utils.six.moves import queue
+from .exceptions import (
+    ConfigError, FunctionError, UnexpectedResponse, ConnectionError, FunctionTimeout, PayloadTooLarge
+)
+
+# The size of the chunks read from responses which are streamed
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def get_text(res):
+    return res.text
+
+
+def get_content(res):
+    return res.content
+
+
+def iter_spool(spool):
+    """
+    Yields the contents of a spooled request in chunks, closing it once read
+    """
+    try:
+        for chunk in iter(lambda: spool.read(STREAM_CHUNK_SIZE), b''):
+            yield chunk
+    finally:
+        spool.close()
+
+
+def iter_response(res):
+    """
+    Yields the body of a response in chunks. Connections which close before
+    the body is complete raise ConnectionError
+    """
+    try:
+        for chunk in res.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            yield chunk
+    except (RequestsConnectionError, ChunkedEncodingError) as e:
+        raise six.reraise(ConnectionError, ConnectionError(*e.args), sys.exc_info()[2])
 
 
 class Function(object):
@@ -13,8 +65,21 @@ class Function(object):
     host = None
     timeout = None
     exception_cls = None
+    priority = INTERACTIVE
+
+    # A `js_host.cache.ResultCache` which stores the output of `call`
+    cache = None
+
+    # A `js_host.cache.ResultCache` which stores the errors returned by the
+    # function, so that data which fails is not resent until the entry expires.
+    # It must define a `max_age`, so that transient errors are retried
+    error_cache = None
+
+    # Overrides the REQUEST_SPOOL_THRESHOLD setting and the host's threshold
+    request_spool_threshold = None
 
-    def __init__(self, name=None, host=None, timeout=None, exception_cls=None):
+    def __init__(self, name=None, host=None, timeout=None, exception_cls=None, priority=None, cache=None,
+                 error_cache=None, request_spool_threshold=None):
         if name is not None:
             self.name = name
 
@@ -27,81 +92,465 @@ class Function(object):
         if exception_cls is not None:
             self.exception_cls = exception_cls
 
+        if priority is not None:
+            self.priority = priority
+
+        if cache is not None:
+            self.cache = cache
+
+        if error_cache is not None:
+            self.error_cache = error_cache
+
+        if request_spool_threshold is not None:
+            self.request_spool_threshold = request_spool_threshold
+
         if not self.name or not isinstance(self.name, six.string_types):
             raise ConfigError('Functions require a name argument')
 
+        if self.error_cache is not None and not self.error_cache.max_age:
+            raise ConfigError(
+                'The error cache of function "{}" must define a max_age, so that errors are retried'.format(self.name)
+            )
+
     def call(self, **kwargs):
-        res = self.send_request(**kwargs)
-        return res.text
+        if self.cache is not None:
+            return self.call_cached(kwargs)
 
-    def send_request(self, **kwargs):
-        host = self.get_host()
+        return self.request_output(kwargs, get_text)
 
-        configured_functions = host.get_config().get('functions', None)
+    def call_cached(self, data):
+        serialized_data = self.serialize_data(data)
+        key = self.get_cache_key(serialized_data)
 
-        if not configured_functions:
-            raise ConfigError(
-                '{} does not have any functions configured in {}'.format(
-                    host.get_name(),
-                    host.config_file,
-                )
-            )
+        # Calls are recorded before the cache is consulted, so that the trace
+        # counts every call rather than only those which missed the cache
+        trace = get_trace()
+        if trace is not None:
+            trace.record(self.name, key[1], serialized_data)
 
-        if self.name not in configured_functions:
-            raise ConfigError(
-                '{}\'s config file does not contain a function named {}'.format(
-                    host.get_name(),
-                    host.config_file,
-                    self.name,
-                )
-            )
+        output, should_refresh = self.cache.lookup(key)
 
-        serialized_data = self.serialize_data(kwargs)
-        params = self.generate_params(serialized_data, kwargs)
-        timeout = self.get_timeout()
+        if output is None:
+            output = self.send_data(data, serialized_data=serialized_data).text
+            self.cache.set(key, output)
+        elif should_refresh:
+            # Stale output is returned immediately, while a single background
+            # call refreshes it
+            thread = threading.Thread(target=self.refresh_cache, args=(data, serialized_data, key))
+            thread.daemon = True
+            thread.start()
 
-        if settings.VERBOSITY >= verbosity.FUNCTION_CALL:
-            print(
-                'Calling function "{}" with params {} and data {}'.format(
-                    self.name,
-                    params,
-                    serialized_data,
-                )
-            )
+        return output
 
+    def refresh_cache(self, data, serialized_data, key):
         try:
-            res = host.send_json_request(
-                'function/{}'.format(self.name),
-                params=params,
-                data=serialized_data,
-                timeout=timeout,
+            output = self.send_data(data, priority=BACKGROUND, serialized_data=serialized_data).text
+        except Exception as e:
+            # The stale entry continues to be served until it leaves the
+            # stale window, so a later call can retry the refresh
+            self.cache.cancel_refresh(key)
+            log.warn(
+                'Failed to refresh the cached output of function "%s": %s',
+                self.name,
+                e,
+                event='refresh_failed',
+                function=self.name,
             )
-        except RequestsConnectionError as e:
-            raise six.reraise(ConnectionError, ConnectionError(*e.args), sys.exc_info()[2])
-        except ReadTimeout as e:
-            raise six.reraise(FunctionTimeout, FunctionTimeout(*e.args), sys.exc_info()[2])
+        else:
+            self.cache.set(key, output)
+
+    def call_bytes(self, **kwargs):
+        """
+        Returns the function's output as bytes, without decoding it
+        """
+        return self.request_output(kwargs, get_content)
+
+    def call_json(self, **kwargs):
+        """
+        Decodes the function's output as JSON, directly from the response's bytes
+        """
+        return self.request_output(kwargs, self.decode_json)
 
-        if res.status_code == 500:
-            if self.exception_cls:
-                raise self.exception_cls(res.text)
+    def request_output(self, data, decode):
+        """
+        Sends `data` and returns the output produced by `decode` from the
+        response. When calls are profiled, decoding is included in the profile
+        """
+        if not settings.PROFILE_CALLS:
+            return decode(self.send_request(**data))
 
-            raise FunctionError(
-                '{name}: {res_text}'.format(
+        profile = CallProfile(self.name)
+
+        try:
+            output = decode(self.send_data(data, profile=profile))
+        except Exception as e:
+            profile.finish(error=e)
+            raise
+
+        profile.finish('decode')
+
+        return output
+
+    def decode_json(self, res):
+        try:
+            return loads(res.content)
+        except ValueError as e:
+            raise UnexpectedResponse(
+                'Function "{name}" did not return valid JSON. {error}: {res_text}'.format(
                     name=self.name,
-                    res_text=res.text,
+                    error=e,
+                    res_text=res.text[:200],
                 )
             )
 
-        if res.status_code != 200:
-            raise UnexpectedResponse(
-                'Called function "{name}". {res_code}: {res_text}'.format(
-                    name=self.name,
-                    res_code=res.status_code,
-                    res_text=res.text,
+    def write_to(self, file_obj, **kwargs):
+        """
+        Streams the function's output into `file_obj` as bytes, without holding
+        the entire response in memory. Returns the number of bytes written
+        """
+        res = self.send_data(kwargs, stream=True)
+
+        # The response's connection is only returned to the pool once it is
+        # closed, including when writing fails part way through
+        with contextlib.closing(res):
+            written = 0
+            for chunk in iter_response(res):
+                written += len(chunk)
+                self.check_response_size(written, res)
+                file_obj.write(chunk)
+
+        return written
+
+    def call_file(self, **kwargs):
+        """
+        Returns the function's output as a binary file object, positioned at its
+        start, which holds up to RESPONSE_SPOOL_THRESHOLD bytes in memory and
+        spills to a temporary file beyond that. The file is deleted once closed.
+
+        Stdio hosts read each response into memory as a whole, so memory is only
+        bounded for hosts which are called over HTTP
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=settings.RESPONSE_SPOOL_THRESHOLD or 0)
+
+        try:
+            self.write_to(spool, **kwargs)
+        except Exception:
+            spool.close()
+            raise
+
+        spool.seek(0)
+        return spool
+
+    def send_request(self, **kwargs):
+        return self.send_data(kwargs)
+
+    @sampled
+    def send_data(self, data, host=None, stream=False, priority=None, serialized_data=None, profile=None):
+        # Callers which decode the response provide their own profile, so that
+        # decoding can be added to it
+        owns_profile = profile is None and settings.PROFILE_CALLS
+        if owns_profile:
+            profile = CallProfile(self.name)
+
+        if host is None:
+            host = self.get_host()
+        elif isinstance(host, six.string_types):
+            host = get_host(host)
+
+        if priority is None:
+            priority = self.priority
+
+        # Callers which serialize the data themselves have already recorded
+        # the call, and background refreshes are not calls
+        trace = get_trace() if serialized_data is None else None
+
+        spool = None
+        error = None
+        started = None
+        res = None
+
+        spool_threshold = self.get_request_spool_threshold(host)
+
+        try:
+            if serialized_data is not None or spool_threshold is None:
+                if serialized_data is None:
+                    serialized_data = self.serialize_data(data)
+                    if profile is not None:
+                        profile.mark('serialize')
+                size = len(serialized_data)
+                self.check_request_size(size)
+                params = self.generate_params(serialized_data, data)
+                if profile is not None:
+                    profile.mark('hash')
+                data_description = serialized_data
+                if trace is not None:
+                    trace.record(self.name, params.get('hash'), serialized_data)
+            else:
+                spool, size, digest = self.spool_data(data, spool_threshold)
+                serialized_data = iter_spool(spool)
+                params = {'hash': digest}
+                if profile is not None:
+                    # Spooled data is hashed as it is serialized
+                    profile.mark('serialize')
+                data_description = '<{} bytes>'.format(size)
+                if trace is not None:
+                    # Spooled data is too large to be worth recording
+                    trace.record(self.name, digest)
+
+            error_key = None
+            if self.error_cache is not None and params.get('hash') is not None:
+                error_key = (self.name, params['hash'])
+                error = self.error_cache.get(error_key)
+                if error is not None:
+                    self.raise_function_error(error)
+
+            timeout = self.get_timeout(host)
+
+            # Responses are read in chunks when their size is limited, so that large
+            # responses are rejected before they are read into memory. The host
+            # reads them, so that they can still be cached once read
+            max_response_size = settings.MAX_RESPONSE_SIZE
+            read = None
+            if max_response_size is not None and not stream:
+                read = self.read_response
+
+            started = time.time()
+
+            try:
+                with profiling.activate(profile):
+                    res = host.send_function_request(
+                        self.name,
+                        params=params,
+                        data=serialized_data,
+                        timeout=timeout,
+                        stream=stream,
+                        priority=priority,
+                        read=read,
+                    )
+            except (RequestsConnectionError, ChunkedEncodingError) as e:
+                # ChunkedEncodingError is raised by connections which close before
+                # the response's body is complete
+                raise six.reraise(ConnectionError, ConnectionError(*e.args), sys.exc_info()[2])
+            except ReadTimeout as e:
+                raise six.reraise(FunctionTimeout, FunctionTimeout(*e.args), sys.exc_info()[2])
+
+            if profile is not None:
+                self.profile_response(profile, host, res)
+
+            if max_response_size is not None and stream:
+                self.read_limited_response(res, stream)
+
+            if res.status_code == 500:
+                # Only errors raised by the function are cached, as timeouts and
+                # connection errors are likely to be transient
+                if error_key is not None:
+                    self.error_cache.set(error_key, res.text)
+
+                self.raise_function_error(res.text)
+
+            if res.status_code != 200:
+                raise UnexpectedResponse(
+                    'Called function "{name}". {res_code}: {res_text}'.format(
+                        name=self.name,
+                        res_code=res.status_code,
+                        res_text=res.text,
+                    )
                 )
+
+            return res
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Spools are closed once they have been sent, but calls which fail before
+            # they are sent would otherwise leave them open
+            if spool is not None:
+                spool.close()
+
+            if owns_profile:
+                profile.finish(error=error)
+
+            # Calls are logged once they have been sent. Failures are always
+            # logged, as they are rare and the most useful to operators
+            if started is not None and log.is_enabled(verbosity.FUNCTION_CALL) and (
+                error is not None or log.is_sampled()
+            ):
+                bytes_received = None
+                if res is not None:
+                    bytes_received = self.get_response_size(res, stream)
+                self.log_call(
+                    host, params, data_description, size, res, bytes_received, time.time() - started, error,
+                )
+
+    def log_call(self, host, params, data, bytes_sent, res, bytes_received, duration, error=None):
+        host_name = host.get_name()
+        status = res.status_code if res is not None else None
+
+        fields = {
+            'event': 'function_call',
+            'function': self.name,
+            'host': host_name,
+            'status': status,
+            'duration': duration,
+            'bytes_sent': bytes_sent,
+            'bytes_received': bytes_received,
+            'error': type(error).__name__ if error is not None else None,
+        }
+
+        if error is None:
+            return log.log(
+                verbosity.FUNCTION_CALL,
+                'Called function "%s" on %s with params %s and data %s. Responded %s in %.1fms',
+                self.name,
+                host_name,
+                params,
+                log.Truncated(data),
+                status,
+                duration * 1000,
+                **fields
+            )
+
+        log.emit(
+            logging.WARNING,
+            'Called function "%s" on %s with params %s and data %s. Failed after %.1fms with %s: %s',
+            (
+                self.name,
+                host_name,
+                params,
+                log.Truncated(data),
+                duration * 1000,
+                fields['error'],
+                log.Truncated(str(error)),
+            ),
+            fields,
+        )
+
+    @staticmethod
+    def get_response_size(res, is_streamed):
+        """
+        Returns the size of a response's body, if it is known without reading
+        the body of a streamed response
+        """
+        if not is_streamed:
+            return len(res.content)
+
+        content_length = res.headers.get('Content-Length')
+        if content_length is not None:
+            return int(content_length)
+
+    def profile_response(self, profile, host, res):
+        """
+        Splits the time spent waiting on the host, after any time spent queued
+        for the host's concurrency limit, into the time taken to receive the
+        response's headers - which includes connecting, sending the data and
+        the function's execution - and the remainder, which is mostly spent
+        reading the response's body
+        """
+        now = time.time()
+        round_trip = now - profile.last_mark
+
+        # Stdio responses have no headers, and cached responses were received
+        # by an earlier call
+        elapsed = getattr(res, 'elapsed', None)
+        if elapsed is not None and elapsed.total_seconds() <= round_trip:
+            profile.phases['request'] = elapsed.total_seconds()
+            profile.phases['receive'] = round_trip - elapsed.total_seconds()
+        else:
+            profile.phases['request'] = round_trip
+        profile.last_mark = now
+
+        profile.host = host.get_name()
+        profile.server_timings = parse_server_timing(res.headers.get('Server-Timing'))
+
+    def raise_function_error(self, error):
+        if self.exception_cls:
+            raise self.exception_cls(error)
+
+        raise FunctionError(
+            '{name}: {error}'.format(
+                name=self.name,
+                error=error,
             )
+        )
+
+    def map(self, iterable, concurrency=None, hosts=None, ordered=True, priority=None):
+        """
+        Calls the function with each dict of kwargs in `iterable`, using a pool of
+        `concurrency` threads which are spread across `hosts`.
+
+        Yields `(kwargs, output, error)` tuples, where `error` is the exception
+        raised by the call, if any. Results are yielded in the order of `iterable`,
+        unless `ordered` is False, in which case they are yielded as they complete.
+        At most `concurrency * 2` items are read ahead of the results which have
+        been consumed. `priority` overrides the function's priority for each call.
+        """
+        if not hosts:
+            hosts = [self.get_host()]
+
+        if concurrency is None:
+            import multiprocessing
+            concurrency = multiprocessing.cpu_count()
+
+        max_in_flight = concurrency * 2
+        tasks = queue.Queue()
+        results = queue.Queue()
+
+        def worker(host):
+            while True:
+                task = tasks.get()
+                if task is None:
+                    return
+                index, kwargs = task
+                try:
+                    output = self.send_data(kwargs, host=host, priority=priority).text
+                except Exception as e:
+                    results.put((index, kwargs, None, e))
+                else:
+                    results.put((index, kwargs, output, None))
+
+        workers = [
+            threading.Thread(target=worker, args=(hosts[i % len(hosts)],))
+            for i in range(concurrency)
+        ]
+        for thread in workers:
+            thread.daemon = True
+            thread.start()
 
-        return res
+        items = enumerate(iterable)
+        exhausted = False
+        in_flight = 0
+        next_index = 0
+        completed = {}
+
+        try:
+            while True:
+                # Apply backpressure by only reading ahead of the consumer by a fixed amount
+                while not exhausted and in_flight < max_in_flight:
+                    try:
+                        tasks.put(next(items))
+                    except StopIteration:
+                        exhausted = True
+                    else:
+                        in_flight += 1
+
+                if not in_flight:
+                    return
+
+                index, kwargs, output, error = results.get()
+
+                if not ordered:
+                    in_flight -= 1
+                    yield kwargs, output, error
+                    continue
+
+                completed[index] = (kwargs, output, error)
+                while next_index in completed:
+                    in_flight -= 1
+                    yield completed.pop(next_index)
+                    next_index += 1
+        finally:
+            for _ in workers:
+                tasks.put(None)
 
     def get_host(self):
         if self.host is None:
@@ -109,6 +558,9 @@ class Function(object):
             from .host import host
             self.host = host
 
+        if isinstance(self.host, six.string_types):
+            return get_host(self.host)
+
         return self.host
 
     def get_name(self):
@@ -123,13 +575,120 @@ class Function(object):
         content = content.encode('utf-8')
         return hashlib.sha1(content).hexdigest()
 
+    def get_cache_key(self, serialized_data):
+        return self.name, self.generate_hash(serialized_data)
+
     def generate_params(self, serialized_data, data):
         return {
             'hash': self.generate_hash(serialized_data)
         }
 
-    def get_timeout(self):
+    def spool_data(self, data, threshold):
+        """
+        Serializes `data` incrementally into a temporary file which spills to
+        disk beyond `threshold` bytes, hashing it on the same pass. Returns the
+        file, the size of the data and its hash
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=threshold)
+        sha1 = hashlib.sha1()
+        size = 0
+
+        # The pure-Python encoder yields many small chunks, which are buffered
+        # so that the file and hash are updated in larger writes
+        buffered = []
+        buffered_size = 0
+
+        try:
+            for chunk in JSONEncoder().iterencode(data):
+                buffered.append(chunk)
+                buffered_size += len(chunk)
+                if buffered_size < STREAM_CHUNK_SIZE:
+                    continue
+
+                content = ''.join(buffered).encode('utf-8')
+                size += len(content)
+                self.check_request_size(size)
+                sha1.update(content)
+                spool.write(content)
+                buffered = []
+                buffered_size = 0
+
+            content = ''.join(buffered).encode('utf-8')
+            size += len(content)
+            self.check_request_size(size)
+            sha1.update(content)
+            spool.write(content)
+        except Exception:
+            spool.close()
+            raise
+
+        spool.seek(0)
+
+        return spool, size, sha1.hexdigest()
+
+    def check_request_size(self, size):
+        max_size = settings.MAX_REQUEST_SIZE
+        if max_size is not None and size > max_size:
+            raise PayloadTooLarge(
+                'Data sent to function "{}" exceeds MAX_REQUEST_SIZE of {} bytes'.format(self.name, max_size)
+            )
+
+    def check_response_size(self, size, res):
+        max_size = settings.MAX_RESPONSE_SIZE
+        if max_size is not None and size > max_size:
+            res.close()
+            raise PayloadTooLarge(
+                'Output of function "{}" exceeds MAX_RESPONSE_SIZE of {} bytes'.format(self.name, max_size)
+            )
+
+    def read_limited_response(self, res, stream):
+        """
+        Rejects responses which exceed MAX_RESPONSE_SIZE. Streamed responses are
+        checked as they are consumed, others are read here in chunks, so that
+        reading stops as soon as the limit is crossed, and their body is returned
+        """
+        content_length = res.headers.get('Content-Length')
+        if content_length is not None:
+            self.check_response_size(int(content_length), res)
+
+        if stream:
+            return
+
+        chunks = []
+        size = 0
+        for chunk in iter_response(res):
+            size += len(chunk)
+            self.check_response_size(size, res)
+            chunks.append(chunk)
+
+        return b''.join(chunks)
+
+    def read_response(self, res):
+        """
+        Reads the body of a streamed response within MAX_RESPONSE_SIZE
+        """
+        return ReadResponse(
+            res.status_code,
+            content=self.read_limited_response(res, stream=False),
+            headers=res.headers,
+            encoding=getattr(res, 'encoding', None),
+            elapsed=getattr(res, 'elapsed', None),
+        )
+
+    def get_request_spool_threshold(self, host=None):
+        if self.request_spool_threshold is not None:
+            return self.request_spool_threshold
+
+        if host is not None and getattr(host, 'request_spool_threshold', None) is not None:
+            return host.request_spool_threshold
+
+        return settings.REQUEST_SPOOL_THRESHOLD
+
+    def get_timeout(self, host=None):
         if self.timeout:
             return self.timeout
 
+        if host is not None and getattr(host, 'function_timeout', None):
+            return host.function_timeout
+
         return settings.FUNCTION_TIMEOUT
\ No newline at end of file
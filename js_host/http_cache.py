@@ -0,0 +1,99 @@
+import time
+from .cache import ResultCache
+
+
+def parse_cache_control(header):
+    """
+    Parses a Cache-Control header into a dict of lower-cased directives. Directives
+    without values map to True
+    """
+    directives = {}
+
+    for directive in (header or '').split(','):
+        name, _, value = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"') if value else True
+
+    return directives
+
+
+class CachedResponse(object):
+    def __init__(self, response, etag, expires):
+        self.response = response
+        self.etag = etag
+        self.expires = expires
+
+    def is_fresh(self):
+        return time.time() < self.expires
+
+
+class HTTPCache(object):
+    """
+    Caches the responses of function endpoints according to the Cache-Control
+    and ETag headers which hosts send with them.
+
+    Responses are fresh for the `max-age` of their Cache-Control header. Once
+    stale, responses with an ETag are revalidated with an If-None-Match
+    request, and a 304 response reuses the cached body. Responses marked
+    `no-store`, or with neither a `max-age` nor an ETag, are not cached.
+    """
+
+    def __init__(self, max_entries):
+        # Freshness is tracked per response, so entries never expire by age
+        self.entries = ResultCache(max_entries=max_entries)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def get_conditional_headers(self, entry, headers=None):
+        """
+        Returns `headers` with the validator of a stale entry added
+        """
+        if entry is None or not entry.etag:
+            return headers
+
+        headers = dict(headers or {})
+        headers['If-None-Match'] = entry.etag
+        return headers
+
+    def handle_response(self, key, res, entry=None):
+        """
+        Stores `res`, or refreshes `entry` if the host has confirmed that it
+        is unchanged. Returns the response which should be used
+        """
+        if res.status_code == 304 and entry is not None:
+            self.store(key, entry.response, res.headers, etag=entry.etag)
+            return entry.response
+
+        if res.status_code == 200:
+            self.store(key, res, res.headers)
+
+        return res
+
+    def store(self, key, res, headers, etag=None):
+        directives = parse_cache_control(headers.get('Cache-Control'))
+        etag = headers.get('ETag') or etag
+
+        if 'no-store' in directives:
+            return
+
+        max_age = 0
+        if 'no-cache' not in directives:
+            try:
+                max_age = int(directives.get('max-age', 0))
+            except ValueError:
+                pass
+
+            # Responses served by an upstream cache may have already aged
+            try:
+                max_age -= int(headers.get('Age', 0))
+            except ValueError:
+                pass
+
+        if max_age <= 0 and not etag:
+            return
+
+        self.entries.set(key, CachedResponse(res, etag, time.time() + max_age))
+
+    def clear(self):
+        self.entries.clear()
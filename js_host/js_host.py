@@ -1,10 +1,19 @@
 import atexit
 import sys
-from requests.exceptions import ConnectionError as RequestsConnectionError
+import threading
+import time
+from requests.exceptions import ConnectionError as RequestsConnectionError, ReadTimeout
+from . import log, profiling
 from .conf import settings
-from .exceptions import ProcessError
+from .exceptions import ConfigError, ConnectionError, FunctionTimeout, ProcessError
 from .utils import six, verbosity
+from .utils.polling import wait_for
+from .utils.priority import INTERACTIVE
+from .utils.six.moves.urllib.parse import urlparse
 from .base_server import BaseServer
+from .limiter import ConcurrencyLimiter
+from .stdio_host import ProcessRetired
+from .stream_connection import StreamConnection
 
 
 class JSHost(BaseServer):
@@ -14,27 +23,153 @@ class JSHost(BaseServer):
     logfile = None
     connection = None
 
+    # Overrides the FUNCTION_TIMEOUT setting
+    function_timeout = None
+
+    # Overrides the REQUEST_SPOOL_THRESHOLD setting
+    request_spool_threshold = None
+
+    # Overrides the TRANSPORT setting
+    transport = None
+
+    # The connection which multiplexes calls when the transport is 'stream'
+    stream_connection = None
+
+    # A mapping of function names to the urls of their endpoints. Built when
+    # the host connects and rebuilt on restarts, rather than during each call
+    functions = None
+
     def __init__(self, manager=None, logfile=None, *args, **kwargs):
         self.manager = manager
         self.logfile = logfile
 
+        # Used by managed hosts to hold calls while restarting
+        self.calls_in_flight = 0
+        self.is_restarting = False
+        self.restart_condition = threading.Condition()
+        # Held for the whole of a restart, so concurrent restarts run in turn
+        self.restart_lock = threading.Lock()
+
+        self.stream_lock = threading.Lock()
+        # Set once the stream server could not be reached, so that calls fall
+        # back to HTTP rather than retrying the connection each time
+        self.stream_unavailable = False
+
+        self.limiter = self.create_limiter(settings.CONCURRENCY_LIMIT)
+
         super(JSHost, self).__init__(*args, **kwargs)
 
+    @staticmethod
+    def create_limiter(concurrency_limit):
+        if not concurrency_limit:
+            return None
+
+        return ConcurrencyLimiter(
+            initial_limit=concurrency_limit,
+            max_limit=max(concurrency_limit, settings.CONCURRENCY_LIMIT_MAX),
+            max_queue=settings.CONCURRENCY_QUEUE_SIZE,
+            queue_timeout=settings.CONCURRENCY_QUEUE_TIMEOUT,
+            interactive_reserve=settings.CONCURRENCY_INTERACTIVE_RESERVE,
+        )
+
+    def configure(self, function_timeout=None, connection_pool_size=None, concurrency_limit=None,
+                  request_spool_threshold=None):
+        """
+        Overrides the global settings for this host
+        """
+        if function_timeout is not None:
+            self.function_timeout = function_timeout
+
+        if request_spool_threshold is not None:
+            self.request_spool_threshold = request_spool_threshold
+
+        if connection_pool_size is not None:
+            self.connection_pool_size = connection_pool_size
+            # The pool is sized when the session is created
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+        if concurrency_limit is not None:
+            self.limiter = self.create_limiter(concurrency_limit)
+
     def stop(self):
         if not self.manager:
             raise NotImplementedError('{} must be stopped manually'.format(self.get_name()))
 
         self.manager.stop_host(self.config_file)
 
-        if settings.VERBOSITY >= verbosity.PROCESS_STOP:
-            print('Stopped {}'.format(self.get_name()))
+        if not wait_for(self.has_stopped, settings.SHUTDOWN_TIMEOUT):
+            raise ProcessError(
+                'Asked {} to stop, but it was still running after {} seconds'.format(
+                    self.get_name(),
+                    settings.SHUTDOWN_TIMEOUT,
+                )
+            )
+
+        log.log(verbosity.PROCESS_STOP, 'Stopped %s', self.get_name(), event='host_stopped', host=self.get_name())
+
+    def can_restart(self):
+        return self.manager is not None
 
     def restart(self):
+        """
+        Restarts a managed host without failing the calls sent to it. Calls in
+        flight are allowed to complete before the host is stopped, and calls made
+        during the restart are held until the new process is accepting requests
+        """
         if not self.manager:
             raise NotImplementedError('{} must be restarted manually'.format(self.get_name()))
 
-        self.manager.restart_host(self.config_file)
-        self.status = self.request_status()
+        with self.restart_lock:
+            with self.restart_condition:
+                self.is_restarting = True
+
+                # Calls in flight are given as long as they would wait for the
+                # host, and are cut off by the restart after that
+                drain_timeout = self.function_timeout or settings.FUNCTION_TIMEOUT
+                deadline = time.time() + drain_timeout
+                while self.calls_in_flight:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        log.warn(
+                            'Restarting %s with %s calls still in flight after waiting %s seconds for them',
+                            self.get_name(),
+                            self.calls_in_flight,
+                            drain_timeout,
+                            event='restart_drain_timeout',
+                            host=self.get_name(),
+                            calls_in_flight=self.calls_in_flight,
+                        )
+                        break
+                    self.restart_condition.wait(remaining)
+
+            try:
+                self.manager.restart_host(
+                    self.config_file,
+                    timeout=settings.SHUTDOWN_TIMEOUT + settings.STARTUP_TIMEOUT,
+                )
+
+                status = wait_for(self.request_status, settings.STARTUP_TIMEOUT)
+                if not status:
+                    raise ProcessError('Restarted {}, but it did not respond'.format(self.get_name()))
+
+                self.status = status
+                self.build_function_registry()
+            finally:
+                # Responses cached before the restart may be invalidated by
+                # changes to the config file or the functions' code
+                self.clear_http_cache()
+
+                # The stream server is a separate process which the manager does
+                # not restart, so its connection is closed rather than left
+                # serving the old functions. It is reopened by the next call
+                self.close_stream_connection()
+                self.stream_unavailable = False
+
+                with self.restart_condition:
+                    self.is_restarting = False
+                    self.restart_condition.notify_all()
 
     def connect(self):
         if self.manager:
@@ -48,6 +183,41 @@ class JSHost(BaseServer):
 
         super(JSHost, self).connect()
 
+        self.build_function_registry()
+
+    def build_function_registry(self):
+        configured_functions = self.get_config().get('functions', None) or ()
+
+        # The registry is replaced rather than mutated, so concurrent calls
+        # will never observe a partially built mapping
+        self.functions = dict(
+            (name, self.get_url('function/{}'.format(name)))
+            for name in configured_functions
+        )
+
+    def get_function_url(self, name):
+        if self.functions is None:
+            self.build_function_registry()
+
+        try:
+            return self.functions[name]
+        except KeyError:
+            if not self.functions:
+                raise ConfigError(
+                    '{} does not have any functions configured in {}'.format(
+                        self.get_name(),
+                        self.config_file,
+                    )
+                )
+
+            raise ConfigError(
+                '{}\'s config file {} does not contain a function named {}'.format(
+                    self.get_name(),
+                    self.config_file,
+                    name,
+                )
+            )
+
     def disconnect(self):
         if not self.manager:
             raise NotImplementedError('Only managed hosts can disconnect'.format(self.get_name()))
@@ -57,16 +227,193 @@ class JSHost(BaseServer):
 
         data = self.manager.close_connection_to_host(self.config_file, self.connection)
 
-        if data['started'] and settings.VERBOSITY >= verbosity.DISCONNECT:
-            message = 'Closed connection to {} - {}'.format(self.get_name(), self.connection)
+        if data['started']:
+            message = 'Closed connection to %s - %s'
+            args = (self.get_name(), self.connection)
             if data['stopTimeout']:
-                message += '. Host will stop in {} seconds unless another connection is opened'.format(
-                    data['stopTimeout'] / 1000.0
-                )
-            print(message)
+                message += '. Host will stop in %s seconds unless another connection is opened'
+                args += (data['stopTimeout'] / 1000.0,)
+            log.log(verbosity.DISCONNECT, message, *args, event='disconnected', host=self.get_name())
 
         self.connection = None
 
+    def get_metrics(self):
+        metrics = {
+            'name': self.get_name(),
+        }
+
+        if self.limiter:
+            metrics['concurrency'] = self.limiter.get_metrics()
+
+        return metrics
+
+    def send_function_request(self, name, params=None, data=None, timeout=None, stream=False,
+                              priority=INTERACTIVE, read=None):
+        # Streamed responses have not been read, so they are never cached
+        cache_key = None if stream else self.get_cache_key(name, params)
+        cache_entry = self.get_cache_entry(cache_key)
+
+        # Fresh responses from the HTTP cache skip the limiter, so that they
+        # do not distort its measurements of the host's latency
+        if cache_entry is not None and cache_entry.is_fresh():
+            return cache_entry.response
+
+        # The limiter is read once, as configuring a new limit replaces it and
+        # the call's slot must be released by the limiter it was acquired from
+        limiter = self.limiter
+        if limiter is None:
+            return self.dispatch_function_request(name, params, data, timeout, stream, cache_key, cache_entry, read)
+
+        limiter.acquire(priority)
+        profiling.mark_active('queue')
+
+        start = time.time()
+        try:
+            res = self.dispatch_function_request(name, params, data, timeout, stream, cache_key, cache_entry, read)
+        except (RequestsConnectionError, ReadTimeout, FunctionTimeout, ProcessError):
+            limiter.release(dropped=True)
+            raise
+        except Exception:
+            limiter.release()
+            raise
+
+        limiter.release(latency=time.time() - start, name=name)
+
+        return res
+
+    @staticmethod
+    def get_cache_key(name, params):
+        # Requests are only cached when their url identifies the data sent
+        if params and params.get('hash'):
+            return name, params['hash']
+
+    def dispatch_function_request(self, name, params, data, timeout, stream, cache_key=None, cache_entry=None,
+                                  read=None):
+        # Only managed hosts can restart, so unmanaged hosts skip the bookkeeping
+        if not self.manager:
+            return self.send_call(name, params, data, timeout, stream, cache_key, cache_entry, read)
+
+        with self.restart_condition:
+            # Calls are held for no longer than they would wait for the host
+            wait_timeout = timeout or settings.FUNCTION_TIMEOUT
+            deadline = time.time() + wait_timeout
+            while self.is_restarting:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise ProcessError(
+                        'Timed out after {} seconds while waiting for {} to restart'.format(
+                            wait_timeout,
+                            self.get_name(),
+                        )
+                    )
+                self.restart_condition.wait(remaining)
+            self.calls_in_flight += 1
+
+        try:
+            return self.send_call(name, params, data, timeout, stream, cache_key, cache_entry, read)
+        finally:
+            with self.restart_condition:
+                self.calls_in_flight -= 1
+                if not self.calls_in_flight:
+                    self.restart_condition.notify_all()
+
+    def send_call(self, name, params, data, timeout, stream, cache_key=None, cache_entry=None, read=None):
+        url = self.get_function_url(name)
+
+        connection = self.get_stream_connection()
+        if connection is not None:
+            try:
+                res = connection.send(name, data, timeout)
+            except ProcessRetired:
+                # The connection was closed after it was selected, and the call
+                # was never written
+                pass
+            else:
+                return read(res) if read is not None else res
+
+        return self.send_json_request(
+            url=url,
+            params=params,
+            data=data,
+            timeout=timeout,
+            stream=stream,
+            cache_key=cache_key,
+            cache_entry=cache_entry,
+            read=read,
+        )
+
+    def get_transport(self):
+        if self.transport:
+            return self.transport
+
+        return settings.TRANSPORT
+
+    def get_stream_address(self):
+        """
+        Returns the address and port of the host's stream server, or None if
+        its config file does not define a `streamPort`
+        """
+        port = self.get_config().get('streamPort')
+        if not port:
+            return None
+
+        if self.root_url:
+            return urlparse(self.root_url).hostname, port
+
+        return self.get_config()['address'], port
+
+    def get_stream_connection(self):
+        """
+        Returns the connection used by the stream transport, opening it if
+        necessary, or None if calls should be sent over HTTP
+        """
+        if self.get_transport() != 'stream' or self.stream_unavailable:
+            return None
+
+        connection = self.stream_connection
+        if connection is not None and not connection.exited:
+            return connection
+
+        with self.stream_lock:
+            # Connections which were closed by the server are replaced
+            if self.stream_connection is None or self.stream_connection.exited:
+                address = self.get_stream_address()
+
+                try:
+                    if address is None:
+                        raise ConnectionError('{} does not define a streamPort'.format(self.config_file))
+                    self.stream_connection = StreamConnection(*address)
+                except (ConnectionError, ValueError, KeyError) as e:
+                    self.stream_unavailable = True
+                    self.stream_connection = None
+                    log.warn(
+                        'Falling back to HTTP for %s: %s',
+                        self.get_name(),
+                        e,
+                        event='stream_unavailable',
+                        host=self.get_name(),
+                    )
+                    return None
+
+                log.log(
+                    verbosity.CONNECT,
+                    'Connected to %s for %s',
+                    self.stream_connection.get_name(),
+                    self.get_name(),
+                    event='stream_connected',
+                    host=self.get_name(),
+                )
+
+            return self.stream_connection
+
+    def close_stream_connection(self):
+        with self.stream_lock:
+            connection = self.stream_connection
+            self.stream_connection = None
+
+        if connection is not None:
+            connection.stop()
+
     def send_request(self, *args, **kwargs):
         """
         Intercept connection errors which suggest that a managed host has
@@ -0,0 +1,163 @@
+import threading
+import time
+from .exceptions import HostOverloaded
+from .utils.priority import INTERACTIVE, BACKGROUND
+
+
+class ConcurrencyLimiter(object):
+    """
+    Limits the number of calls in flight to a host, adapting the limit to the
+    latency that the host exhibits.
+
+    The limit grows additively while calls complete close to the baseline
+    latency of the function called, and shrinks multiplicatively when latency rises above it or calls
+    are dropped. Calls beyond the limit are queued, and calls beyond the
+    queue's capacity raise `HostOverloaded`. Interactive and background calls
+    each have a queue of `max_queue` calls.
+
+    A share of the limit is reserved for interactive calls, and background
+    calls will not start while interactive calls are waiting, so interactive
+    calls never queue behind bulk work
+    """
+
+    # Calls slower than the baseline latency multiplied by this are treated as
+    # a sign of congestion
+    latency_tolerance = 2.0
+
+    # The ratio that the limit is multiplied by when congestion is detected
+    backoff_ratio = 0.9
+
+    # Each function's baseline tracks the minimum latency observed for it, but
+    # drifts upwards so that a single fast outlier cannot pin it forever.
+    # Functions have their own baselines, as a host which serves both cheap and
+    # expensive functions would otherwise appear congested
+    baseline_drift = 1.01
+
+    def __init__(self, initial_limit, max_limit=None, min_limit=1, max_queue=0, queue_timeout=None,
+                 interactive_reserve=0):
+        self.limit = float(initial_limit)
+        self.interactive_reserve = interactive_reserve
+        self.max_limit = max_limit or initial_limit
+        self.min_limit = min_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.queued = 0
+        self.queued_interactive = 0
+        self.baseline_latencies = {}
+
+        self.completed = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def has_capacity(self, priority=INTERACTIVE):
+        limit = int(self.limit)
+
+        if priority == BACKGROUND:
+            if self.queued_interactive:
+                return False
+            # Background calls can always use at least one slot
+            limit = max(1, limit - int(limit * self.interactive_reserve))
+
+        return self.in_flight < limit
+
+    def acquire(self, priority=INTERACTIVE):
+        is_interactive = priority != BACKGROUND
+
+        with self.condition:
+            # Calls only skip the queue when no call of the same or higher priority is waiting
+            is_waiting = self.queued_interactive if is_interactive else self.queued
+            if not is_waiting and self.has_capacity(priority):
+                self.in_flight += 1
+                return
+
+            # Each priority has its own queue capacity, so that bulk work can not
+            # fill the queue and cause interactive calls to be rejected
+            if is_interactive:
+                queued = self.queued_interactive
+            else:
+                queued = self.queued - self.queued_interactive
+
+            if queued >= self.max_queue:
+                self.rejected += 1
+                raise HostOverloaded(
+                    '{} calls are in flight and {} are queued'.format(self.in_flight, self.queued)
+                )
+
+            self.queued += 1
+            if is_interactive:
+                self.queued_interactive += 1
+            try:
+                deadline = None
+                if self.queue_timeout is not None:
+                    deadline = time.time() + self.queue_timeout
+
+                while not self.has_capacity(priority):
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            self.rejected += 1
+                            raise HostOverloaded(
+                                'Call was queued for more than {} seconds'.format(self.queue_timeout)
+                            )
+                    self.condition.wait(remaining)
+            finally:
+                self.queued -= 1
+                if is_interactive:
+                    self.queued_interactive -= 1
+
+            self.in_flight += 1
+
+    def release(self, latency=None, dropped=False, name=None):
+        """
+        Releases a call's slot. `latency` should be provided for calls that the
+        host responded to, and `dropped` for calls that timed out or failed to
+        connect. Calls which failed for other reasons should provide neither.
+        `name` identifies the function called, which latency is compared against
+        """
+        with self.condition:
+            if dropped:
+                self.dropped += 1
+                self.decrease_limit()
+            elif latency is not None:
+                self.completed += 1
+                self.observe_latency(latency, name)
+
+            self.in_flight -= 1
+
+            # Waiters of both priorities share the condition and a freed slot may
+            # only be usable by some of them, so all of them are woken to re-check
+            self.condition.notify_all()
+
+    def observe_latency(self, latency, name=None):
+        baseline = self.baseline_latencies.get(name)
+        if baseline is None:
+            baseline = latency
+        else:
+            baseline = min(latency, baseline * self.baseline_drift)
+        self.baseline_latencies[name] = baseline
+
+        if latency > baseline * self.latency_tolerance:
+            self.decrease_limit()
+        elif self.in_flight * 2 >= self.limit:
+            # Only grow the limit when it is actually being used
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def decrease_limit(self):
+        self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+
+    def get_metrics(self):
+        with self.condition:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'queued_interactive': self.queued_interactive,
+                'baseline_latencies': dict(self.baseline_latencies),
+                'completed': self.completed,
+                'dropped': self.dropped,
+                'rejected': self.rejected,
+            }
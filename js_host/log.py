@@ -0,0 +1,113 @@
+# Sends the library's output through the `js_host` logger. Messages are gated
+# by the VERBOSITY setting, formatted lazily and carry structured fields as
+# attributes of their log records, so that they can be consumed by structured
+# logging handlers
+
+import logging
+import random
+import sys
+import threading
+from .conf import settings
+from .utils import verbosity
+
+logger = logging.getLogger('js_host')
+
+
+class StdoutHandler(logging.StreamHandler):
+    """
+    Writes to the current `sys.stdout`, so that redirections of stdout made
+    after the handler was created are respected
+    """
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class Truncated(object):
+    """
+    Truncates a payload to the LOG_PAYLOAD_LIMIT setting when it is formatted,
+    so that no work is done for messages which are never emitted
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        limit = settings.LOG_PAYLOAD_LIMIT
+        if limit is None or len(self.text) <= limit:
+            return self.text
+
+        return '{}... ({} more characters)'.format(self.text[:limit], len(self.text) - limit)
+
+
+_handler = None
+_handler_lock = threading.Lock()
+
+
+def install_handler():
+    """
+    Writes the logger's messages to stdout, unless the LOG_TO_STDOUT setting is
+    False, in which case they propagate to the application's handlers
+    """
+    global _handler
+
+    if _handler is not None or not settings.LOG_TO_STDOUT:
+        return
+
+    with _handler_lock:
+        if _handler is None:
+            handler = StdoutHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.DEBUG)
+            logger.propagate = False
+            _handler = handler
+
+
+def get_level(required_verbosity):
+    if required_verbosity >= verbosity.FUNCTION_CALL:
+        return logging.DEBUG
+    return logging.INFO
+
+
+def is_enabled(required_verbosity):
+    return settings.VERBOSITY >= required_verbosity
+
+
+def emit(level, message, args, fields):
+    install_handler()
+
+    if logger.isEnabledFor(level):
+        logger.log(level, message, *args, extra=fields)
+
+
+def log(required_verbosity, message, *args, **fields):
+    """
+    Logs `message` if the VERBOSITY setting is at least `required_verbosity`.
+    `args` are interpolated into `message` only if it is emitted, and `fields`
+    are set as attributes of the log record
+    """
+    if settings.VERBOSITY >= required_verbosity:
+        emit(get_level(required_verbosity), message, args, fields)
+
+
+def warn(message, *args, **fields):
+    """
+    Logs a warning, unless the VERBOSITY setting is SILENT
+    """
+    if settings.VERBOSITY > verbosity.SILENT:
+        emit(logging.WARNING, message, args, fields)
+
+
+def is_sampled():
+    """
+    Returns True for the share of function calls that the LOG_SAMPLE_RATE
+    setting indicates should be logged
+    """
+    rate = settings.LOG_SAMPLE_RATE
+    return rate >= 1 or random.random() < rate
@@ -1,8 +1,9 @@
-import time
 from .base_server import BaseServer
+from . import log
 from .conf import settings
 from .utils import verbosity
-from .exceptions import UnexpectedResponse
+from .utils.polling import wait_for
+from .exceptions import ProcessError, UnexpectedResponse
 
 
 class JSHostManager(BaseServer):
@@ -23,13 +24,17 @@ class JSHostManager(BaseServer):
                 )
             )
 
-        if settings.VERBOSITY >= verbosity.PROCESS_STOP:
-            print('Stopped {}'.format(self.get_name()))
+        # The response is sent just before the process stops, so we poll until
+        # its address stops accepting requests
+        if not wait_for(self.has_stopped, settings.SHUTDOWN_TIMEOUT):
+            raise ProcessError(
+                'Asked {} to stop, but it was still running after {} seconds'.format(
+                    self.get_name(),
+                    settings.SHUTDOWN_TIMEOUT,
+                )
+            )
 
-        # The request will end just before the process stops, so there is a tiny
-        # possibility of a race condition. We delay as a precaution so that we
-        # can be reasonably confident of the system's state.
-        time.sleep(0.05)
+        log.log(verbosity.PROCESS_STOP, 'Stopped %s', self.get_name(), event='manager_stopped', host=self.get_name())
 
     def request_host_status(self, config_file):
         res = self.send_json_request('host/status', data={'config': config_file})
@@ -82,12 +87,13 @@ class JSHostManager(BaseServer):
 
         return res.json()
 
-    def restart_host(self, config_file):
+    def restart_host(self, config_file, timeout=None):
         """
-        Restarts a managed host specified by `config_file`.
+        Restarts a managed host specified by `config_file`, waiting up to
+        `timeout` seconds for the manager to respond
         """
 
-        res = self.send_json_request('host/restart', data={'config': config_file})
+        res = self.send_json_request('host/restart', data={'config': config_file}, timeout=timeout)
 
         if res.status_code != 200:
             raise UnexpectedResponse(
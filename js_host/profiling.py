@@ -0,0 +1,151 @@
+# Records where the time of each function call is spent, when the PROFILE_CALLS
+# setting is enabled
+
+import collections
+import contextlib
+import threading
+import time
+
+
+def parse_server_timing(header):
+    """
+    Parses a Server-Timing header into an OrderedDict which maps the name of
+    each metric to its duration in seconds. Metrics without durations are
+    omitted
+    """
+    timings = collections.OrderedDict()
+
+    for metric in (header or '').split(','):
+        params = metric.strip().split(';')
+        name = params[0].strip()
+        for param in params[1:]:
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'dur':
+                try:
+                    # Durations are sent in milliseconds
+                    timings[name] = float(value.strip('"')) / 1000.0
+                except ValueError:
+                    pass
+
+    return timings
+
+
+class CallProfile(object):
+    """
+    The timings of a single call. `phases` maps the name of each phase of the
+    call to its duration in seconds, in the order in which they occurred, and
+    `server_timings` holds any timings which the host reported in a
+    Server-Timing header. `error` is the name of the exception raised by the
+    call, or None if it succeeded
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.host = None
+        self.error = None
+        self.phases = collections.OrderedDict()
+        self.server_timings = collections.OrderedDict()
+        self.started = time.time()
+        self.last_mark = self.started
+        self.total = None
+
+    def mark(self, phase):
+        """
+        Records the time since the previous phase ended as the duration of `phase`
+        """
+        now = time.time()
+        self.phases[phase] = now - self.last_mark
+        self.last_mark = now
+
+    def finish(self, phase=None, error=None):
+        if phase is not None:
+            self.mark(phase)
+
+        if error is not None:
+            self.error = type(error).__name__
+
+        self.total = self.last_mark - self.started
+
+        profiler.record(self)
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'host': self.host,
+            'error': self.error,
+            'started': self.started,
+            'total': self.total,
+            'phases': dict(self.phases),
+            'server_timings': dict(self.server_timings),
+        }
+
+    def __repr__(self):
+        return '<CallProfile {} {}>'.format(
+            self.name,
+            ' '.join('{}={:.2f}ms'.format(phase, duration * 1000) for phase, duration in self.phases.items()),
+        )
+
+
+class Profiler(object):
+    """
+    Holds the most recent profiles and passes each profile to its listeners
+    as it is recorded
+    """
+
+    def __init__(self, max_recent=100):
+        self.lock = threading.Lock()
+        self.recent = collections.deque(maxlen=max_recent)
+        self.listeners = []
+
+    def add_listener(self, listener):
+        with self.lock:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self.lock:
+            self.listeners.remove(listener)
+
+    def record(self, profile):
+        with self.lock:
+            self.recent.append(profile)
+            listeners = list(self.listeners)
+
+        for listener in listeners:
+            listener(profile)
+
+    def get_recent(self):
+        with self.lock:
+            return list(self.recent)
+
+    def clear(self):
+        with self.lock:
+            self.recent.clear()
+
+
+profiler = Profiler()
+
+
+_active = threading.local()
+
+
+@contextlib.contextmanager
+def activate(profile):
+    """
+    Makes `profile` the active profile of the current thread within the block,
+    so that hosts can mark the phases which they handle
+    """
+    previous = getattr(_active, 'profile', None)
+    _active.profile = profile
+    try:
+        yield
+    finally:
+        _active.profile = previous
+
+
+def mark_active(phase):
+    """
+    Marks `phase` on the current thread's active profile, if there is one
+    """
+    profile = getattr(_active, 'profile', None)
+    if profile is not None:
+        profile.mark(phase)
@@ -0,0 +1,138 @@
+# Lazily starts and shares the hosts defined in the HOSTS setting
+
+import os
+import threading
+from .conf import settings, validate_host_settings
+from .exceptions import ConfigError
+
+# The options which can be defined for each host. Options which are not
+# defined fall back to the global setting of the same name, except ROOT_URL,
+# as the global url belongs to the default host. Hosts without a ROOT_URL are
+# reached at the address in their config file
+HOST_OPTIONS = (
+    'CONFIG_FILE',
+    'ROOT_URL',
+    'USE_MANAGER',
+    'USE_STDIO',
+    'STDIO_POOL_SIZE',
+    'FUNCTION_TIMEOUT',
+    'CONNECTION_POOL_SIZE',
+    'CONCURRENCY_LIMIT',
+    'REQUEST_SPOOL_THRESHOLD',
+)
+
+
+class HostRegistry(object):
+    def __init__(self):
+        self.hosts = {}
+        self.startups = {}
+        self.lock = threading.Lock()
+        # Each host is started under its own lock, so that a slow host does
+        # not block access to hosts which have already started
+        self.host_locks = {}
+
+    def get_host(self, name):
+        host = self.hosts.get(name)
+        if host is not None:
+            return host
+
+        with self.lock:
+            host_lock = self.host_locks.setdefault(name, threading.Lock())
+
+        with host_lock:
+            if name not in self.hosts:
+                self.hosts[name] = self.start_host(name)
+
+        return self.hosts[name]
+
+    def get_options(self, name):
+        try:
+            options = settings.HOSTS[name]
+        except KeyError:
+            raise ConfigError('No host named "{}" has been defined in the HOSTS setting'.format(name))
+
+        unknown_options = set(options) - set(HOST_OPTIONS)
+        if unknown_options:
+            raise ConfigError(
+                'Unknown options {} defined for host "{}". Hosts accept {}'.format(
+                    ', '.join(sorted(unknown_options)),
+                    name,
+                    ', '.join(HOST_OPTIONS),
+                )
+            )
+
+        if not options.get('CONFIG_FILE'):
+            raise ConfigError('Host "{}" does not define a CONFIG_FILE'.format(name))
+
+        self.validate_options(name, options)
+
+        return options
+
+    def validate_options(self, name, options):
+        """
+        Applies the checks made against the global settings to a host's options,
+        so that invalid combinations are raised before any process is started
+        """
+        use_stdio = options.get('USE_STDIO', settings.USE_STDIO)
+
+        try:
+            validate_host_settings(
+                options.get('ROOT_URL'),
+                options.get('USE_MANAGER', settings.USE_MANAGER),
+                use_stdio,
+            )
+        except ConfigError as e:
+            raise ConfigError('Invalid options for host "{}": {}'.format(name, e))
+
+        if use_stdio and (options.get('CONNECTION_POOL_SIZE') or options.get('CONCURRENCY_LIMIT')):
+            raise ConfigError(
+                'Invalid options for host "{}": CONNECTION_POOL_SIZE and CONCURRENCY_LIMIT can not be combined '
+                'with USE_STDIO'.format(name)
+            )
+
+    def get_config_file(self, options):
+        path = options['CONFIG_FILE']
+
+        if not os.path.isabs(path):
+            path = os.path.join(settings.SOURCE_ROOT, path)
+
+        if not os.path.isfile(path):
+            raise ConfigError('Config file {} does not exist'.format(path))
+
+        return path
+
+    def start_host(self, name):
+        from .startup import Startup
+
+        options = self.get_options(name)
+
+        startup = Startup(
+            config_file=self.get_config_file(options),
+            root_url=options.get('ROOT_URL'),
+            use_manager=options.get('USE_MANAGER', settings.USE_MANAGER),
+            use_stdio=options.get('USE_STDIO', settings.USE_STDIO),
+            stdio_pool_size=options.get('STDIO_POOL_SIZE'),
+        )
+        manager, host = startup.run()
+
+        host.configure(
+            function_timeout=options.get('FUNCTION_TIMEOUT'),
+            connection_pool_size=options.get('CONNECTION_POOL_SIZE'),
+            concurrency_limit=options.get('CONCURRENCY_LIMIT'),
+            request_spool_threshold=options.get('REQUEST_SPOOL_THRESHOLD'),
+        )
+
+        self.startups[name] = startup
+
+        return host
+
+
+registry = HostRegistry()
+
+
+def get_host(name):
+    """
+    Returns the host defined by `name` in the HOSTS setting, starting it if
+    necessary
+    """
+    return registry.get_host(name)
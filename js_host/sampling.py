@@ -0,0 +1,252 @@
+# A sampling profiler which only samples threads while they are calling
+# functions or spawning processes, so that the cost of the client can be
+# profiled without profiling the rest of an application.
+#
+# Samples are aggregated as collapsed stacks, which can be converted to the
+# speedscope format (https://www.speedscope.app) or summarized with
+#
+#   python -m js_host.sampling samples.txt --format speedscope > profile.json
+#   python -m js_host.sampling samples.txt --format top
+
+import argparse
+import atexit
+import collections
+import functools
+import json
+import sys
+import threading
+import time
+from .conf import settings
+
+
+def get_frame_label(frame):
+    code = frame.f_code
+    return '{} ({}:{})'.format(code.co_name, code.co_filename, code.co_firstlineno)
+
+
+class Tracking(object):
+    """
+    Marks the calling frame's thread as sampled until the block exits. Only
+    the frames below the calling frame are recorded
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def __enter__(self):
+        self.profiler.enter(threading.current_thread().ident, sys._getframe(1))
+
+    def __exit__(self, *exc_info):
+        self.profiler.exit(threading.current_thread().ident)
+
+
+class SamplingProfiler(object):
+    def __init__(self, interval=None):
+        self.interval = interval
+        self.lock = threading.Lock()
+        # Maps the ids of sampled threads to (entry_frame, depth) tuples
+        self.active = {}
+        self.has_active = threading.Event()
+        self.stacks = collections.Counter()
+        self.thread = None
+
+    def get_interval(self):
+        return self.interval or settings.SAMPLE_INTERVAL
+
+    def track(self):
+        return Tracking(self)
+
+    def enter(self, thread_id, frame):
+        with self.lock:
+            if thread_id in self.active:
+                # Nested regions are sampled from the outermost entry
+                entry_frame, depth = self.active[thread_id]
+                self.active[thread_id] = (entry_frame, depth + 1)
+            else:
+                self.active[thread_id] = (frame, 1)
+            self.has_active.set()
+
+            if self.thread is None:
+                self.start()
+
+    def exit(self, thread_id):
+        with self.lock:
+            entry_frame, depth = self.active[thread_id]
+            if depth > 1:
+                self.active[thread_id] = (entry_frame, depth - 1)
+            else:
+                del self.active[thread_id]
+                if not self.active:
+                    self.has_active.clear()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+        if settings.SAMPLE_FILE:
+            atexit.register(self.write_sample_file)
+
+    def run(self):
+        while True:
+            self.has_active.wait()
+            self.sample()
+            time.sleep(self.get_interval())
+
+    def sample(self):
+        with self.lock:
+            active = dict(self.active)
+
+        if not active:
+            return
+
+        frames = sys._current_frames()
+
+        for thread_id, (entry_frame, depth) in active.items():
+            frame = frames.get(thread_id)
+
+            stack = []
+            while frame is not None and frame is not entry_frame:
+                stack.append(get_frame_label(frame))
+                frame = frame.f_back
+
+            # The thread may have left the region since it was read
+            if frame is None or not stack:
+                continue
+
+            stack.reverse()
+            with self.lock:
+                self.stacks[tuple(stack)] += 1
+
+    def get_stacks(self):
+        with self.lock:
+            return collections.Counter(self.stacks)
+
+    def clear(self):
+        with self.lock:
+            self.stacks.clear()
+
+    def write_collapsed(self, file_obj):
+        write_collapsed(self.get_stacks(), file_obj)
+
+    def write_speedscope(self, file_obj, name='js_host'):
+        json.dump(to_speedscope(self.get_stacks(), self.get_interval(), name), file_obj)
+
+    def write_sample_file(self):
+        with open(settings.SAMPLE_FILE, 'w') as file_obj:
+            self.write_collapsed(file_obj)
+
+
+sampler = SamplingProfiler()
+
+
+def sampled(func):
+    """
+    Samples the decorated function's calls when the SAMPLE_CALLS setting is True
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not settings.SAMPLE_CALLS:
+            return func(*args, **kwargs)
+
+        with sampler.track():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def write_collapsed(stacks, file_obj):
+    for stack, count in sorted(stacks.items()):
+        file_obj.write('{} {}\n'.format(';'.join(stack), count))
+
+
+def read_collapsed(file_obj):
+    stacks = collections.Counter()
+
+    for line in file_obj:
+        stack, _, count = line.rstrip('\n').rpartition(' ')
+        if stack:
+            stacks[tuple(stack.split(';'))] += int(count)
+
+    return stacks
+
+
+def to_speedscope(stacks, interval, name='js_host'):
+    """
+    Converts collapsed stacks to a speedscope profile, weighting each sample
+    by the sampling interval
+    """
+    frames = []
+    frame_indexes = {}
+    samples = []
+    weights = []
+
+    for stack, count in sorted(stacks.items()):
+        sample = []
+        for label in stack:
+            if label not in frame_indexes:
+                frame_indexes[label] = len(frames)
+                frames.append({'name': label})
+            sample.append(frame_indexes[label])
+
+        samples.append(sample)
+        weights.append(count * interval)
+
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights,
+        }],
+        'exporter': 'js_host',
+    }
+
+
+def get_top_frames(stacks, limit=20):
+    """
+    Returns a list of (label, self_samples, total_samples) tuples for the
+    frames with the most samples of their own
+    """
+    self_samples = collections.Counter()
+    total_samples = collections.Counter()
+
+    for stack, count in stacks.items():
+        self_samples[stack[-1]] += count
+        # Recursive frames are only counted once per stack
+        for label in set(stack):
+            total_samples[label] += count
+
+    return [
+        (label, count, total_samples[label])
+        for label, count in self_samples.most_common(limit)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Converts or summarizes collapsed stacks recorded by js_host')
+    parser.add_argument('file', help='a file of collapsed stacks, as written to the SAMPLE_FILE setting')
+    parser.add_argument('--format', choices=('top', 'speedscope'), default='top')
+    parser.add_argument('--interval', type=float, default=0.005, help='the interval that the samples were taken at')
+    parser.add_argument('--limit', type=int, default=20, help='the number of frames listed by the top format')
+    args = parser.parse_args(argv)
+
+    with open(args.file) as file_obj:
+        stacks = read_collapsed(file_obj)
+
+    if args.format == 'speedscope':
+        json.dump(to_speedscope(stacks, args.interval), sys.stdout)
+    else:
+        total = sum(stacks.values()) or 1
+        print('{:>8} {:>8}  {}'.format('self %', 'total %', 'frame'))
+        for label, self_count, total_count in get_top_frames(stacks, args.limit):
+            print('{:>8.1f} {:>8.1f}  {}'.format(100.0 * self_count / total, 100.0 * total_count / total, label))
+
+
+if __name__ == '__main__':
+    main()
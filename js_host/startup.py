@@ -0,0 +1,161 @@
+# Starts and connects to the host defined by a config file. Steps which do not
+# depend on each other are overlapped, and the duration of each phase is recorded
+
+import copy
+import time
+from collections import OrderedDict
+import requests
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+from .bin import read_status_from_config_file, spawn_detached_manager, spawn_managed_host
+from . import log
+from .conf import settings
+from .exceptions import ConnectionError
+from .js_host import JSHost
+from .manager import JSHostManager
+from .stdio_host import StdioHost
+from .utils import verbosity
+from .utils.background import BackgroundCall
+from .watcher import ConfigWatcher
+
+
+def request_status(root_url):
+    try:
+        res = requests.get('{}/status'.format(root_url), timeout=settings.STARTUP_TIMEOUT)
+    except (RequestsConnectionError, Timeout):
+        return None
+
+    try:
+        return res.json()
+    except ValueError:
+        return None
+
+
+class Startup(object):
+    config_file = None
+    root_url = None
+    use_manager = False
+    use_stdio = False
+    stdio_pool_size = None
+
+    def __init__(self, config_file, root_url=None, use_manager=None, use_stdio=None, stdio_pool_size=None):
+        self.config_file = config_file
+
+        if root_url is not None:
+            self.root_url = root_url
+
+        if use_manager is not None:
+            self.use_manager = use_manager
+
+        if use_stdio is not None:
+            self.use_stdio = use_stdio
+
+        if stdio_pool_size is not None:
+            self.stdio_pool_size = stdio_pool_size
+
+        self.timings = OrderedDict()
+        self.manager = None
+        self.host = None
+        self.watcher = None
+
+    def time(self, phase, func, *args, **kwargs):
+        start = time.time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.timings[phase] = time.time() - start
+
+    def run(self):
+        start = time.time()
+
+        if self.use_stdio:
+            # Stdio hosts run as children of this process, so there is nothing to probe
+            self.host = StdioHost(config_file=self.config_file, pool_size=self.stdio_pool_size)
+            self.time('start stdio host', self.host.connect)
+        else:
+            self.start_server()
+
+        self.timings['total'] = time.time() - start
+
+        if settings.WATCH_CONFIG_FILES:
+            self.watcher = ConfigWatcher([self.host])
+            self.watcher.start()
+
+        if log.is_enabled(verbosity.VERBOSE):
+            log.log(
+                verbosity.VERBOSE,
+                'Started in %.3fs. %s',
+                self.timings['total'],
+                ', '.join('{}: {:.3f}s'.format(phase, duration) for phase, duration in self.timings.items()),
+                event='startup',
+                timings=dict(self.timings),
+            )
+
+        return self.manager, self.host
+
+    def start_server(self):
+        probe = None
+        if self.root_url:
+            # The host's url is already known, so it can be probed while the
+            # config file is being read
+            probe = BackgroundCall(request_status, self.root_url)
+            probe.start()
+
+        status = self.time('read config', read_status_from_config_file, self.config_file)
+
+        if probe:
+            remote_status = self.time('probe', probe.join)
+        else:
+            remote_status = self.time('probe', request_status, 'http://{}:{}'.format(
+                status['config']['address'],
+                status['config']['port'],
+            ))
+
+        if remote_status == status:
+            self.host = JSHost(
+                status=status,
+                config_file=self.config_file,
+                root_url=self.root_url,
+            )
+            self.time('connect', self.host.connect)
+        elif self.use_manager:
+            self.start_managed_host(status, remote_status)
+        else:
+            raise ConnectionError('Cannot connect to JSHost at {}'.format(
+                self.root_url or 'http://{}:{}'.format(status['config']['address'], status['config']['port'])
+            ))
+
+    def start_managed_host(self, status, remote_status):
+        # Avoid re-reading the config file again by cloning and manually
+        # editing the status object
+        manager_status = copy.deepcopy(status)
+        manager_status['type'] = JSHostManager.expected_type_name
+        if 'functions' in manager_status:
+            manager_status['functions'] = {}
+
+        manager = JSHostManager(
+            status=manager_status,
+            config_file=self.config_file,
+        )
+
+        # Managers run as persistent processes at the address in the config
+        # file, so the probe has already told us if one is running
+        if manager.matches_status(remote_status):
+            self.time('connect to manager', manager.connect)
+        else:
+            manager = self.time(
+                'spawn manager',
+                spawn_detached_manager,
+                config_file=self.config_file,
+                status=manager_status,
+            )
+
+        self.manager = manager
+
+        self.host = self.time(
+            'spawn host',
+            spawn_managed_host,
+            config_file=self.config_file,
+            manager=manager,
+            connect_on_start=False,
+        )
+        self.time('connect', self.host.connect)
@@ -0,0 +1,131 @@
+// Serves the functions defined in a config file over the process's stdin and
+// stdout, rather than over a network listener.
+//
+// Requests and responses are newline-delimited JSON objects. Once the config
+// file has been loaded, the names of its functions are written as the first
+// line, so that the parent process can detect when the child is ready.
+//
+// If a port is given, or the config file defines a `streamPort`, the same
+// protocol is served over every TCP connection to that port instead, so that
+// networked clients can multiplex their calls over a single connection. Each
+// connection receives the names of the functions as its first line, and the
+// address that was bound is written to stdout.
+//
+// Usage: node stdio_host.js /path/to/host.config.js [--port 9010] [--address 127.0.0.1]
+
+var net = require('net');
+var path = require('path');
+var readline = require('readline');
+
+var stdout = process.stdout;
+var writeStdout = stdout.write.bind(stdout);
+
+// Functions which log to stdout would corrupt the stream of responses, so
+// their output is redirected to stderr
+console.log = console.info = console.error;
+stdout.write = process.stderr.write.bind(process.stderr);
+
+function getArg(name) {
+  var index = process.argv.indexOf('--' + name);
+  return index === -1 ? undefined : process.argv[index + 1];
+}
+
+var config = require(path.resolve(process.argv[2]));
+var functions = config.functions || {};
+
+var port = getArg('port') || config.streamPort;
+var address = getArg('address') || config.address || '127.0.0.1';
+
+var inFlight = 0;
+var isClosed = false;
+
+function serve(input, writeLine) {
+  function write(obj) {
+    writeLine(JSON.stringify(obj) + '\n');
+  }
+
+  function respond(id, err, output) {
+    if (err) {
+      return write({id: id, error: err.stack || String(err)});
+    }
+    if (Buffer.isBuffer(output)) {
+      return write({id: id, output: output.toString('base64'), encoding: 'base64'});
+    }
+    if (typeof output !== 'string') {
+      output = output === undefined ? '' : JSON.stringify(output);
+    }
+    write({id: id, output: output});
+  }
+
+  function handle(line) {
+    var request;
+    try {
+      request = JSON.parse(line);
+    } catch(err) {
+      return respond(null, err);
+    }
+
+    var func = functions[request.function];
+    if (!func) {
+      return respond(request.id, new Error('Unknown function "' + request.function + '"'));
+    }
+
+    inFlight++;
+
+    var hasResponded = false;
+    var done = function(err, output) {
+      if (hasResponded) return;
+      hasResponded = true;
+      inFlight--;
+      respond(request.id, err, output);
+      if (isClosed && !inFlight) {
+        process.exit(0);
+      }
+    };
+
+    try {
+      func(request.data, done);
+    } catch(err) {
+      done(err);
+    }
+  }
+
+  var lines = readline.createInterface({input: input, terminal: false});
+  lines.on('line', handle);
+
+  write({functions: Object.keys(functions)});
+
+  return lines;
+}
+
+if (port === undefined) {
+  var lines = serve(process.stdin, writeStdout);
+
+  // The parent has closed our stdin, either because it has exited or because
+  // this process is being retired. Any calls in flight are completed first
+  lines.on('close', function() {
+    isClosed = true;
+    if (!inFlight) {
+      process.exit(0);
+    }
+  });
+} else {
+  var server = net.createServer(function(socket) {
+    socket.setNoDelay(true);
+
+    // Clients which disconnect with calls in flight are expected, and their
+    // responses are discarded
+    socket.on('error', function() {});
+
+    serve(socket, function(line) {
+      if (socket.writable) {
+        socket.write(line);
+      }
+    });
+  });
+
+  server.listen(Number(port), address, function() {
+    var bound = server.address();
+    writeStdout(JSON.stringify({functions: Object.keys(functions), address: bound.address, port: bound.port}) + '\n');
+  });
+}
@@ -0,0 +1,421 @@
+import atexit
+import base64
+import itertools
+import json
+import os
+import subprocess
+import threading
+from . import log
+from .conf import settings
+from .exceptions import ConfigError, FunctionTimeout, ProcessError
+from .utils import six, verbosity
+from .utils.background import BackgroundCall
+from .utils.polling import wait_for
+from .utils.response import ReadResponse
+
+PATH_TO_STDIO_HOST = os.path.join(os.path.dirname(__file__), 'stdio_host.js')
+
+
+class ProcessRetired(ProcessError):
+    """
+    Raised when a call is sent to a process which has stopped accepting
+    calls. The call was never written, so it is safe to send it elsewhere
+    """
+
+
+class PendingResponse(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+
+
+class FramedChannel(object):
+    """
+    Sends calls to a config file's functions as newline-delimited JSON frames
+    over a pair of byte streams. Requests are tagged with ids, so many calls
+    can be in flight at once, and responses are matched to their calls by a
+    background reader.
+
+    Subclasses open `self.input` and `self.output` and define `get_name`.
+    """
+
+    input = None
+    output = None
+    reader = None
+
+    def __init__(self):
+        self.ids = itertools.count()
+        self.pending = {}
+        self.lock = threading.Lock()
+        # Writes are serialized separately, so that a blocking write can never
+        # prevent the reader from draining the responses
+        self.write_lock = threading.Lock()
+        self.functions = None
+        self.exited = False
+        self.accepting = True
+
+    def get_name(self):
+        raise NotImplementedError()
+
+    def read_functions(self, line):
+        """
+        The first line written by the other end lists the functions that it serves
+        """
+        self.functions = frozenset(json.loads(line.decode('utf-8'))['functions'])
+
+    def start_reading(self):
+        self.reader = threading.Thread(target=self.read_responses)
+        self.reader.daemon = True
+        self.reader.start()
+
+    def read_responses(self):
+        try:
+            for line in iter(self.output.readline, b''):
+                self.handle_line(line)
+        except (IOError, OSError):
+            # A reset connection ends the channel, as an exit would
+            pass
+
+        with self.lock:
+            self.exited = True
+            pending_responses = list(self.pending.values())
+            self.pending.clear()
+
+        # Wake any callers still waiting on a response
+        for pending in pending_responses:
+            pending.event.set()
+
+    def handle_line(self, line):
+        try:
+            data = json.loads(line.decode('utf-8'))
+            request_id = data['id']
+        except (ValueError, TypeError, KeyError):
+            # Functions' output is redirected to stderr, but a stray write
+            # should not stop responses from being read
+            log.warn(
+                'Ignored unexpected output from %s: %s',
+                self.get_name(),
+                log.Truncated(line.decode('utf-8', 'replace').rstrip('\n')),
+                event='unexpected_output',
+                channel=self.get_name(),
+            )
+            return
+
+        with self.lock:
+            pending = self.pending.pop(request_id, None)
+
+        # The caller may have already given up on the response
+        if pending is None:
+            return
+
+        if 'error' in data:
+            pending.response = ReadResponse(500, text=data['error'])
+        elif data.get('encoding') == 'base64':
+            # Buffers are sent as base64, so binary output survives the trip
+            pending.response = ReadResponse(200, content=base64.b64decode(data['output']))
+        else:
+            pending.response = ReadResponse(200, text=data['output'])
+        pending.event.set()
+
+    def send(self, name, serialized_data, timeout=None):
+        pending = PendingResponse()
+
+        with self.lock:
+            if self.exited:
+                raise ProcessError('{} has exited'.format(self.get_name()))
+
+            request_id = next(self.ids)
+            self.pending[request_id] = pending
+
+        # The data has already been serialized, so it is spliced into the
+        # frame rather than encoded a second time. Spooled data arrives as
+        # chunks of bytes, which are written as they are read
+        if serialized_data is None or isinstance(serialized_data, six.string_types):
+            chunks = [serialized_data or '{}']
+        else:
+            chunks = serialized_data
+        prefix = '{{"id":{},"function":{},"data":'.format(request_id, json.dumps(name))
+
+        with self.write_lock:
+            if not self.accepting:
+                with self.lock:
+                    self.pending.pop(request_id, None)
+                raise ProcessRetired('{} has stopped accepting calls'.format(self.get_name()))
+
+            try:
+                self.input.write(prefix.encode('utf-8'))
+                for chunk in chunks:
+                    if not isinstance(chunk, bytes):
+                        chunk = chunk.encode('utf-8')
+                    self.input.write(chunk)
+                self.input.write(b'}\n')
+                self.input.flush()
+            except (IOError, OSError) as e:
+                with self.lock:
+                    self.pending.pop(request_id, None)
+                raise ProcessError('Failed to write to {}: {}'.format(self.get_name(), e))
+
+        if not pending.event.wait(timeout):
+            with self.lock:
+                self.pending.pop(request_id, None)
+            raise FunctionTimeout(
+                'Function "{}" did not respond within {} seconds'.format(name, timeout)
+            )
+
+        if pending.response is None:
+            raise ProcessError(
+                '{} exited before function "{}" responded'.format(self.get_name(), name)
+            )
+
+        return pending.response
+
+    def get_load(self):
+        return len(self.pending)
+
+
+class StdioProcess(FramedChannel):
+    """
+    A child node process which serves a config file's functions over its
+    stdin and stdout.
+    """
+
+    def __init__(self, config_file):
+        super(StdioProcess, self).__init__()
+
+        self.config_file = config_file
+
+        self.process = subprocess.Popen(
+            (settings.get_path_to_node(), PATH_TO_STDIO_HOST, config_file),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self.input = self.process.stdin
+        self.output = self.process.stdout
+
+        read_line = BackgroundCall(self.output.readline)
+        read_line.start()
+        line = read_line.join(settings.STARTUP_TIMEOUT)
+
+        if read_line.is_alive():
+            self.process.kill()
+            self.process.wait()
+            raise ProcessError(
+                'Timed out after {} seconds while starting a stdio host for config file {}'.format(
+                    settings.STARTUP_TIMEOUT,
+                    config_file,
+                )
+            )
+
+        if not line:
+            self.process.wait()
+            raise ProcessError('Failed to start a stdio host for config file {}'.format(config_file))
+        self.read_functions(line)
+
+        self.start_reading()
+
+    def get_name(self):
+        return 'Stdio host for {}'.format(self.config_file)
+
+    def get_pid(self):
+        return self.process.pid
+
+    def stop(self, timeout=None):
+        """
+        Stops accepting calls and signals the child to exit once its calls in
+        flight have completed. The child is killed if it has not exited within
+        `timeout` seconds
+        """
+        with self.write_lock:
+            if not self.accepting:
+                return
+            self.accepting = False
+
+            # Closing stdin signals the child to exit
+            try:
+                self.process.stdin.close()
+            except (IOError, OSError):
+                pass
+
+        if timeout is None:
+            timeout = settings.FUNCTION_TIMEOUT
+
+        if not wait_for(lambda: self.process.poll() is not None, timeout):
+            self.process.kill()
+            self.process.wait()
+
+
+class StdioHost(object):
+    """
+    Spawns a pool of child node processes which serve a config file's
+    functions over their stdin and stdout. No ports are bound, and the
+    children exit once their parent process has closed their pipes.
+    """
+
+    config_file = None
+    pool_size = None
+
+    # Overrides the FUNCTION_TIMEOUT setting
+    function_timeout = None
+
+    # Overrides the REQUEST_SPOOL_THRESHOLD setting
+    request_spool_threshold = None
+
+    def __init__(self, config_file=None, pool_size=None):
+        if config_file is not None:
+            self.config_file = config_file
+
+        if pool_size is not None:
+            self.pool_size = pool_size
+
+        self.processes = []
+        self.functions = None
+
+    def get_name(self):
+        return '{} [{}]'.format(type(self).__name__, self.get_config_file())
+
+    def get_config_file(self):
+        if self.config_file:
+            return self.config_file
+
+        return settings.get_config_file()
+
+    def get_pool_size(self):
+        if self.pool_size:
+            return self.pool_size
+
+        if settings.STDIO_POOL_SIZE:
+            return settings.STDIO_POOL_SIZE
+
+        import multiprocessing
+        return multiprocessing.cpu_count()
+
+    @property
+    def has_connected(self):
+        return bool(self.processes)
+
+    def can_restart(self):
+        return True
+
+    def configure(self, function_timeout=None, connection_pool_size=None, concurrency_limit=None,
+                  request_spool_threshold=None):
+        """
+        Overrides the global settings for this host. Stdio hosts do not open
+        connections or limit their concurrency, so only the timeout and spool
+        threshold apply
+        """
+        if connection_pool_size is not None or concurrency_limit is not None:
+            raise ConfigError('{} does not support connection pools or concurrency limits'.format(self.get_name()))
+
+        if function_timeout is not None:
+            self.function_timeout = function_timeout
+
+        if request_spool_threshold is not None:
+            self.request_spool_threshold = request_spool_threshold
+
+    def connect(self):
+        self.start()
+
+    def spawn_processes(self):
+        config_file = self.get_config_file()
+
+        processes = []
+        try:
+            for _ in range(self.get_pool_size()):
+                processes.append(StdioProcess(config_file))
+        except ProcessError:
+            for process in processes:
+                process.stop()
+            raise
+
+        return processes
+
+    def start(self):
+        if self.processes:
+            return
+
+        processes = self.spawn_processes()
+
+        self.functions = processes[0].functions
+        self.processes = processes
+
+        atexit.register(self.stop)
+
+        log.log(
+            verbosity.PROCESS_START,
+            'Started %s with %s processes',
+            self.get_name(),
+            len(processes),
+            event='host_started',
+            host=self.get_name(),
+        )
+
+    def restart(self):
+        """
+        Starts a new pool of processes while the current pool continues to
+        serve calls. Once every new process has loaded the config file, calls
+        are switched to the new pool and the old processes are stopped after
+        their calls in flight have completed
+        """
+        if not self.processes:
+            return self.start()
+
+        old_processes = self.processes
+
+        # Each process only returns once it has loaded the config file, so
+        # a failure here leaves the current pool serving calls
+        processes = self.spawn_processes()
+
+        self.functions = processes[0].functions
+        self.processes = processes
+
+        for process in old_processes:
+            process.stop()
+
+        log.log(
+            verbosity.PROCESS_START,
+            'Restarted %s with %s processes',
+            self.get_name(),
+            len(processes),
+            event='host_restarted',
+            host=self.get_name(),
+        )
+
+    def stop(self):
+        processes = self.processes
+        self.processes = []
+
+        for process in processes:
+            process.stop()
+
+        if processes:
+            log.log(verbosity.PROCESS_STOP, 'Stopped %s', self.get_name(), event='host_stopped', host=self.get_name())
+
+    def get_process(self):
+        processes = self.processes
+
+        if not processes:
+            raise ProcessError('{} has not been started. Call `start()`'.format(self.get_name()))
+
+        # Prefer the child with the fewest calls in flight
+        return min(processes, key=StdioProcess.get_load)
+
+    def send_function_request(self, name, params=None, data=None, timeout=None, stream=False, priority=None,
+                              read=None):
+        # Calls are not limited, so `priority` is accepted for compatibility
+        # with JSHost but has no effect
+        process = self.get_process()
+
+        # Each process checks against its own functions, as a restart may
+        # change them while calls are being sent
+        if name not in process.functions:
+            raise ConfigError(
+                '{}\'s config file does not contain a function named {}'.format(self.get_name(), name)
+            )
+
+        try:
+            res = process.send(name, data, timeout)
+        except ProcessRetired:
+            # A restart retired the process after it was selected
+            res = self.get_process().send(name, data, timeout)
+
+        return read(res) if read is not None else res
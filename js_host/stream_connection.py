@@ -0,0 +1,83 @@
+# A persistent TCP connection to a stream server - `stdio_host.js` run with a
+# port - which multiplexes a host's calls over the framed protocol spoken by
+# stdio hosts, rather than sending an HTTP request per call
+
+import socket
+from .conf import settings
+from .exceptions import ConnectionError
+from .stdio_host import FramedChannel
+from .utils.polling import wait_for
+
+
+class StreamConnection(FramedChannel):
+    def __init__(self, address, port):
+        super(StreamConnection, self).__init__()
+
+        self.address = address
+        self.port = port
+
+        try:
+            self.socket = socket.create_connection((address, port), timeout=settings.STARTUP_TIMEOUT)
+        except socket.error as e:
+            raise ConnectionError('Failed to connect to {}: {}'.format(self.get_name(), e))
+
+        # Small frames would otherwise be delayed by Nagle's algorithm
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.input = self.socket.makefile('wb')
+        self.output = self.socket.makefile('rb')
+
+        try:
+            line = self.output.readline()
+            if not line:
+                raise ConnectionError('{} closed before listing its functions'.format(self.get_name()))
+            self.read_functions(line)
+        except socket.error as e:
+            self.close()
+            raise ConnectionError('Failed to connect to {}: {}'.format(self.get_name(), e))
+        except Exception:
+            self.close()
+            raise
+
+        # Calls are bounded by their own timeouts once connected
+        self.socket.settimeout(None)
+
+        self.start_reading()
+
+    def get_name(self):
+        return 'Stream server at {}:{}'.format(self.address, self.port)
+
+    def close(self):
+        # Shutting down the socket ends the reader's loop, so that the files
+        # are never closed beneath it
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except (IOError, OSError):
+            pass
+
+        if self.reader is not None:
+            self.reader.join(settings.SHUTDOWN_TIMEOUT)
+
+        for stream in (self.input, self.output):
+            try:
+                stream.close()
+            except (IOError, OSError):
+                pass
+        self.socket.close()
+
+    def stop(self, timeout=None):
+        """
+        Stops accepting calls and closes the connection once the calls in
+        flight have completed, or after `timeout` seconds
+        """
+        with self.write_lock:
+            if not self.accepting:
+                return
+            self.accepting = False
+
+        if timeout is None:
+            timeout = settings.FUNCTION_TIMEOUT
+
+        wait_for(lambda: not self.pending, timeout)
+
+        self.close()
@@ -0,0 +1,226 @@
+# A proxy which injects faults between the client and a host, so that the
+# client's handling of slow, failing and unreliable hosts can be tested and
+# benchmarked on a single machine.
+#
+# Faults are drawn from a random number generator seeded with `seed`, so the
+# nth request to the proxy always receives the same fault.
+#
+# Usage:
+#
+#   python -m js_host.testing.faults http://127.0.0.1:9009 --port 8000 \
+#       --latency 0.05 --drop-rate 0.01 --truncate-rate 0.01 --error-rate 0.05
+#
+# Once listening, the proxy's url is printed to stdout.
+
+import argparse
+import collections
+import random
+import socket
+import sys
+import threading
+import time
+from requests.exceptions import RequestException
+from .stand_in import StandInRequestHandler, StandInServer
+
+# Faults which can be injected into a request
+DROP = 'drop'
+TRUNCATE = 'truncate'
+ERROR = 'error'
+
+# Headers which describe a single connection, rather than the response
+HOP_BY_HOP_HEADERS = (
+    'connection', 'keep-alive', 'transfer-encoding', 'content-length', 'content-encoding',
+)
+
+
+class FaultInjectingRequestHandler(StandInRequestHandler):
+    def do_GET(self):
+        self.proxy_request('GET', None)
+
+    def do_POST(self):
+        self.proxy_request('POST', self.read_body())
+
+    def drop_connection(self):
+        self.close_connection = True
+        self.connection.shutdown(socket.SHUT_RDWR)
+
+    def proxy_request(self, method, body):
+        proxy = self.server.proxy
+        latency, fault = proxy.get_fault(self.path)
+
+        if latency:
+            time.sleep(latency)
+
+        if fault == DROP:
+            return self.drop_connection()
+
+        if fault == ERROR:
+            return self.send_body(500, 'Fault injected by {}'.format(proxy.get_url()))
+
+        headers = {}
+        if self.headers.get('Content-Type'):
+            headers['Content-Type'] = self.headers['Content-Type']
+
+        try:
+            res = proxy.session.request(
+                method, proxy.target_url + self.path, data=body, headers=headers, timeout=proxy.timeout,
+            )
+        except RequestException as e:
+            # The host's failures are reported to the client as a gateway
+            # error, so they can not be mistaken for injected faults
+            proxy.record_upstream_error()
+            return self.send_body(502, 'Request to {} failed: {}'.format(proxy.target_url, e))
+
+        self.send_response(res.status_code)
+        for name, value in res.headers.items():
+            if name.lower() not in HOP_BY_HOP_HEADERS:
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(res.content)))
+        self.end_headers()
+
+        if fault == TRUNCATE:
+            # The declared length is sent with half of the body, before the
+            # connection is closed
+            self.wfile.write(res.content[:len(res.content) // 2])
+            self.wfile.flush()
+            return self.drop_connection()
+
+        self.wfile.write(res.content)
+
+
+class FaultProxy(object):
+    """
+    Proxies requests to `target_url`, injecting faults into those whose paths
+    begin with one of `paths`:
+
+    - `latency`: seconds added to each request, plus up to `jitter` seconds
+    - `drop_rate`: the share of requests whose connection is closed before a
+      response is sent
+    - `truncate_rate`: the share of responses whose connection is closed
+      after half of the body is sent
+    - `error_rate`: the share of requests which receive a 500 response
+      without reaching the host
+
+    Requests to other paths, such as the host's `/status` endpoint, are proxied
+    without faults. Requests which the host fails to respond to within
+    `timeout` seconds, or at all, receive 502 responses.
+    """
+
+    def __init__(self, target_url, latency=0, jitter=0, drop_rate=0, truncate_rate=0, error_rate=0,
+                 seed=0, paths=('/function/',), address='127.0.0.1', port=0, timeout=30.0):
+        import requests
+
+        self.target_url = target_url.rstrip('/')
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.truncate_rate = truncate_rate
+        self.error_rate = error_rate
+        self.paths = paths
+        self.timeout = timeout
+
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        # Counts the requests which received each fault
+        self.faults = collections.Counter()
+        # Counts the requests which the host failed to respond to
+        self.upstream_errors = 0
+
+        self.session = requests.Session()
+        self.server = StandInServer((address, port), FaultInjectingRequestHandler)
+        self.server.proxy = self
+        self.thread = None
+
+    def get_url(self):
+        address, port = self.server.server_address[:2]
+        return 'http://{}:{}'.format(address, port)
+
+    def get_fault(self, path):
+        """
+        Returns a tuple of (latency, fault) for the next request to `path`,
+        where `fault` is one of DROP, TRUNCATE, ERROR or None
+        """
+        if not path.startswith(self.paths):
+            return 0, None
+
+        # Every request consumes the same number of random values, so the
+        # faults received by later requests do not depend on earlier ones
+        with self.lock:
+            jitter = self.random.random()
+            roll = self.random.random()
+
+            fault = None
+            for name, rate in ((DROP, self.drop_rate), (TRUNCATE, self.truncate_rate), (ERROR, self.error_rate)):
+                if roll < rate:
+                    fault = name
+                    break
+                roll -= rate
+
+            self.faults[fault] += 1
+
+        return self.latency + jitter * self.jitter, fault
+
+    def record_upstream_error(self):
+        with self.lock:
+            self.upstream_errors += 1
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.session.close()
+
+    def get_host(self, status):
+        """
+        Returns a connected JSHost which sends its calls through the proxy to
+        the host described by `status`
+        """
+        from ..js_host import JSHost
+
+        host = JSHost(status=status, root_url=self.get_url())
+        host.connect()
+        return host
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Proxies requests to a host, injecting faults')
+    parser.add_argument('target_url', help='the url of the host')
+    parser.add_argument('--address', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to each call')
+    parser.add_argument('--jitter', type=float, default=0, help='up to this many seconds are added to the latency')
+    parser.add_argument('--drop-rate', type=float, default=0)
+    parser.add_argument('--truncate-rate', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=30.0, help='seconds to wait for the host to respond')
+    args = parser.parse_args(argv)
+
+    proxy = FaultProxy(
+        args.target_url,
+        latency=args.latency,
+        jitter=args.jitter,
+        drop_rate=args.drop_rate,
+        truncate_rate=args.truncate_rate,
+        error_rate=args.error_rate,
+        seed=args.seed,
+        address=args.address,
+        port=args.port,
+        timeout=args.timeout,
+    )
+
+    sys.stdout.write(proxy.get_url() + '\n')
+    sys.stdout.flush()
+
+    try:
+        proxy.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+# Drives function calls at increasing levels of concurrency and reports their
+# throughput, latency percentiles and error rates, so that the point at which
+# a host saturates can be found and configurations can be compared.
+#
+# By default, calls are sent to a stand-in host which is spawned for the run
+#
+#   python -m js_host.testing.load --function echo --data '{"echo": "foo"}' --concurrency 1,2,4,8,16
+#   python -m js_host.testing.load --root-url http://127.0.0.1:9009 --function my_function --rate 200
+#
+# With `--rate`, calls are scheduled at a fixed rate and their latency is
+# measured from when they were scheduled, rather than from when they were
+# sent, so that a slow host cannot hide its latency by delaying the calls
+# which would have observed it.
+
+import argparse
+import collections
+import json
+import math
+import subprocess
+import sys
+import threading
+import time
+
+
+def percentile(sorted_values, fraction):
+    """
+    Returns the nearest-rank percentile of a sorted list, or None if it is empty
+    """
+    if not sorted_values:
+        return None
+
+    index = int(math.ceil(fraction * len(sorted_values))) - 1
+    return sorted_values[min(max(index, 0), len(sorted_values) - 1)]
+
+
+class LoadReport(object):
+    def __init__(self, concurrency, duration, latencies, errors, rate=None):
+        self.concurrency = concurrency
+        self.duration = duration
+        self.latencies = sorted(latencies)
+        # Maps the names of the exceptions raised by calls to their counts
+        self.errors = errors
+        self.rate = rate
+
+    @property
+    def calls(self):
+        return len(self.latencies) + sum(self.errors.values())
+
+    @property
+    def error_rate(self):
+        if not self.calls:
+            return 0.0
+        return float(sum(self.errors.values())) / self.calls
+
+    @property
+    def throughput(self):
+        """
+        The number of successful calls per second
+        """
+        if not self.duration:
+            return 0.0
+        return len(self.latencies) / self.duration
+
+    def get_percentiles(self):
+        return collections.OrderedDict((
+            ('p50', percentile(self.latencies, 0.5)),
+            ('p90', percentile(self.latencies, 0.9)),
+            ('p99', percentile(self.latencies, 0.99)),
+            ('max', self.latencies[-1] if self.latencies else None),
+        ))
+
+    def as_dict(self):
+        return {
+            'concurrency': self.concurrency,
+            'rate': self.rate,
+            'duration': self.duration,
+            'calls': self.calls,
+            'throughput': self.throughput,
+            'error_rate': self.error_rate,
+            'errors': dict(self.errors),
+            'latency': self.get_percentiles(),
+        }
+
+    def __str__(self):
+        latency = ' '.join(
+            '{} {}'.format(name, '-' if value is None else '{:.2f}ms'.format(value * 1000))
+            for name, value in self.get_percentiles().items()
+        )
+        return 'concurrency {:>3}: {:>9.1f} calls/s, {}, errors {:.1%}'.format(
+            self.concurrency, self.throughput, latency, self.error_rate,
+        )
+
+
+def run_load(call, duration=5.0, concurrency=1, rate=None):
+    """
+    Invokes `call` from `concurrency` threads for `duration` seconds and
+    returns a LoadReport.
+
+    Each thread sends its next call as soon as its last one returns, unless
+    a `rate` of calls per second is given, in which case the calls are
+    scheduled at that rate and shared between the threads.
+    """
+    lock = threading.Lock()
+    latencies = []
+    errors = collections.Counter()
+    scheduled_calls = [0]
+
+    start = time.time()
+    deadline = start + duration
+
+    def get_scheduled_time():
+        if rate is None:
+            now = time.time()
+            return now if now < deadline else None
+
+        with lock:
+            scheduled = start + scheduled_calls[0] / float(rate)
+            scheduled_calls[0] += 1
+
+        return scheduled if scheduled < deadline else None
+
+    def worker():
+        # Results are collected per thread, to avoid contending for the lock
+        worker_latencies = []
+        worker_errors = collections.Counter()
+
+        while True:
+            scheduled = get_scheduled_time()
+            if scheduled is None:
+                break
+
+            delay = scheduled - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            try:
+                call()
+            except Exception as e:
+                worker_errors[type(e).__name__] += 1
+            else:
+                worker_latencies.append(time.time() - scheduled)
+
+        with lock:
+            latencies.extend(worker_latencies)
+            errors.update(worker_errors)
+
+    threads = [threading.Thread(target=worker) for i in range(concurrency)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return LoadReport(concurrency, time.time() - start, latencies, errors, rate)
+
+
+def find_saturation(call, concurrency_levels, duration=5.0, rate=None, tolerance=0.05, on_report=None):
+    """
+    Runs `call` at each of the `concurrency_levels` and returns a tuple of
+    (reports, saturation), where `saturation` is the first level beyond which
+    throughput improved by less than `tolerance`, or None if it kept improving
+    """
+    reports = []
+    saturation = None
+
+    for concurrency in concurrency_levels:
+        report = run_load(call, duration, concurrency, rate)
+
+        if saturation is None and reports:
+            previous = reports[-1]
+            if report.throughput < previous.throughput * (1 + tolerance):
+                saturation = previous.concurrency
+
+        reports.append(report)
+        if on_report is not None:
+            on_report(report)
+
+    return reports, saturation
+
+
+def spawn_stand_in(stream=False):
+    """
+    Spawns a stand-in host in a separate process, so that its serving does not
+    compete with the load generator for the GIL. Returns a tuple of the process
+    and the host's status
+    """
+    args = [sys.executable, '-m', 'js_host.testing.stand_in']
+    if stream:
+        args.append('--stream')
+
+    process = subprocess.Popen(args, stdout=subprocess.PIPE)
+    line = process.stdout.readline()
+
+    if not line:
+        process.wait()
+        raise RuntimeError('The stand-in host exited before reporting its status')
+
+    return process, json.loads(line.decode('utf-8'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load tests function calls against a js-host')
+    parser.add_argument('--root-url', help='the url of a running host, otherwise a stand-in host is spawned')
+    parser.add_argument('--function', default='echo')
+    parser.add_argument('--data', default='{"echo": "foo"}', help='the JSON data sent with each call')
+    parser.add_argument('--concurrency', default='1,2,4,8,16', help='comma-separated levels of concurrency')
+    parser.add_argument('--duration', type=float, default=5.0, help='the number of seconds to run each level for')
+    parser.add_argument('--rate', type=float, help='schedule calls at a fixed rate per second')
+    parser.add_argument(
+        '--compare-persistent-connections', action='store_true',
+        help='also run each level with a new connection per call',
+    )
+    parser.add_argument(
+        '--compare-transports', action='store_true',
+        help='also run each level over the stream transport, which the host must support',
+    )
+    parser.add_argument('--json', action='store_true', help='print the reports as JSON lines')
+    args = parser.parse_args(argv)
+
+    import requests
+    from ..conf import settings
+    from ..function import Function
+    from ..js_host import JSHost
+    from ..utils import verbosity
+
+    settings.configure(VERBOSITY=verbosity.SILENT, CONNECT_ONCE_CONFIGURED=False)
+
+    data = json.loads(args.data)
+    concurrency_levels = [int(level) for level in args.concurrency.split(',')]
+
+    process = None
+    if args.root_url:
+        status = requests.get(args.root_url.rstrip('/') + '/status').json()
+    else:
+        process, status = spawn_stand_in(stream=args.compare_transports)
+
+    root_url = args.root_url.rstrip('/') if args.root_url else None
+
+    def get_host(persistent_connections=True, transport='http'):
+        host = JSHost(status=status, root_url=root_url)
+        host.persistent_connections = persistent_connections
+        host.transport = transport
+        host.connect()
+        return host
+
+    configurations = [('persistent connections', {})]
+    if args.compare_persistent_connections:
+        configurations.append(('a connection per call', {'persistent_connections': False}))
+    if args.compare_transports:
+        configurations.append(('the stream transport', {'transport': 'stream'}))
+
+    def on_report(report):
+        if args.json:
+            print(json.dumps(report.as_dict()))
+        else:
+            print(report)
+        sys.stdout.flush()
+
+    try:
+        for label, options in configurations:
+            host = get_host(**options)
+            if host.get_transport() == 'stream' and host.get_stream_connection() is None:
+                print('{} does not support the stream transport\n'.format(host.get_name()))
+                continue
+
+            function = Function(args.function, host=host)
+
+            if not args.json:
+                print('{} with {}'.format(args.function, label))
+
+            reports, saturation = find_saturation(
+                lambda: function.call(**data), concurrency_levels, args.duration, args.rate, on_report=on_report,
+            )
+
+            if not args.json:
+                if saturation is None:
+                    print('Throughput did not saturate\n')
+                else:
+                    print('Throughput saturated at a concurrency of {}\n'.format(saturation))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
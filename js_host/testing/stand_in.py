@@ -0,0 +1,280 @@
+# A pure-Python stand-in for a js-host process, which serves python functions
+# over the same `/status` and `/function/<name>` endpoints as a node host.
+# It allows the client to be exercised and load tested without node.
+#
+# Usage: python -m js_host.testing.stand_in [--address 127.0.0.1] [--port 0] [--stream]
+#
+# Once listening, the host's status is printed to stdout as a line of JSON.
+# With `--stream`, the functions are also served over the framed protocol of
+# `stdio_host.js`, at the `streamPort` reported in the status.
+
+import argparse
+import base64
+import json
+import socket
+import sys
+import threading
+import time
+import traceback
+from ..utils import six
+from ..utils.six.moves import BaseHTTPServer, socketserver
+from ..utils.six.moves.urllib.parse import urlparse
+
+# The js-host version which the stand-in's status reports
+VERSION = '0.12.0'
+
+
+def echo(data):
+    if not data.get('echo'):
+        raise ValueError('No `echo` prop provided')
+    return data['echo']
+
+
+def echo_data(data):
+    return json.dumps(data)
+
+
+def sleep(data):
+    time.sleep(data.get('duration', 0))
+    return ''
+
+
+def error(data):
+    raise Exception('Hello from error function')
+
+
+DEFAULT_FUNCTIONS = {
+    'echo': echo,
+    'echo_data': echo_data,
+    'sleep': sleep,
+    'error': error,
+}
+
+
+class StandInRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # Connections are kept alive, as they are by node
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        # Small responses would otherwise be delayed by Nagle's algorithm
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status_code, body, content_type='text/plain'):
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+
+        self.send_response(status_code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                chunks.append(self.rfile.read(size))
+                # Each chunk is followed by a CRLF
+                self.rfile.readline()
+                if not size:
+                    return b''.join(chunks)
+
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/status':
+            return self.send_body(200, json.dumps(self.server.host.status), 'application/json')
+
+        self.send_body(404, 'Not found')
+
+    def do_POST(self):
+        body = self.read_body()
+        path = urlparse(self.path).path
+
+        if not path.startswith('/function/'):
+            return self.send_body(404, 'Not found')
+
+        name = path[len('/function/'):]
+        func = self.server.host.functions.get(name)
+        if func is None:
+            return self.send_body(404, 'Function "{}" not found'.format(name))
+
+        try:
+            data = json.loads(body.decode('utf-8')) if body else {}
+            output = func(data)
+        except Exception:
+            return self.send_body(500, traceback.format_exc())
+
+        if isinstance(output, six.binary_type):
+            return self.send_body(200, output, 'application/octet-stream')
+
+        if not isinstance(output, six.string_types) and output is not None:
+            output = json.dumps(output)
+
+        self.send_body(200, output or '')
+
+
+class StandInServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients which close their connection before a response is complete
+        # are expected, as are the errors they cause
+        if not isinstance(sys.exc_info()[1], socket.error):
+            BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+
+class StandInStreamHandler(socketserver.StreamRequestHandler):
+    """
+    Serves the framed protocol of `stdio_host.js`. Each call runs in its own
+    thread, so that many calls can be in flight over one connection
+    """
+
+    def setup(self):
+        socketserver.StreamRequestHandler.setup(self)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.write_lock = threading.Lock()
+
+    def write(self, obj):
+        line = (json.dumps(obj) + '\n').encode('utf-8')
+
+        # Clients which disconnect with calls in flight are expected, and
+        # their responses are discarded
+        with self.write_lock:
+            try:
+                self.wfile.write(line)
+                self.wfile.flush()
+            except (socket.error, ValueError):
+                pass
+
+    def handle(self):
+        self.write({'functions': sorted(self.server.host.functions)})
+
+        for line in iter(self.rfile.readline, b''):
+            thread = threading.Thread(target=self.call, args=(json.loads(line.decode('utf-8')),))
+            thread.daemon = True
+            thread.start()
+
+    def call(self, request):
+        request_id = request['id']
+
+        func = self.server.host.functions.get(request['function'])
+        if func is None:
+            return self.write({'id': request_id, 'error': 'Unknown function "{}"'.format(request['function'])})
+
+        try:
+            output = func(request.get('data') or {})
+        except Exception:
+            return self.write({'id': request_id, 'error': traceback.format_exc()})
+
+        if isinstance(output, six.binary_type):
+            output = base64.b64encode(output).decode('ascii')
+            return self.write({'id': request_id, 'output': output, 'encoding': 'base64'})
+
+        if not isinstance(output, six.string_types) and output is not None:
+            output = json.dumps(output)
+
+        self.write({'id': request_id, 'output': output or ''})
+
+
+class StandInStreamServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StandInHost(object):
+    """
+    Serves `functions` - a dict which maps names to callables that accept the
+    data sent to a function - from a background thread. Functions may return
+    strings, bytes or JSON-serializable objects, and any exceptions that they
+    raise are returned as 500 responses.
+
+    If `stream` is True, the functions are also served by a stream server at
+    the `streamPort` in the host's status.
+    """
+
+    def __init__(self, functions=None, address='127.0.0.1', port=0, stream=False):
+        self.functions = DEFAULT_FUNCTIONS if functions is None else functions
+        self.server = StandInServer((address, port), StandInRequestHandler)
+        self.server.host = self
+        self.threads = []
+
+        address, port = self.server.server_address[:2]
+        self.status = {
+            'version': VERSION,
+            'type': 'Host',
+            'config': {
+                'address': address,
+                'port': port,
+                'functions': sorted(self.functions),
+            },
+        }
+
+        self.stream_server = None
+        if stream:
+            self.stream_server = StandInStreamServer((address, 0), StandInStreamHandler)
+            self.stream_server.host = self
+            self.status['config']['streamPort'] = self.stream_server.server_address[1]
+
+    def get_servers(self):
+        if self.stream_server is None:
+            return [self.server]
+        return [self.server, self.stream_server]
+
+    def start(self):
+        for server in self.get_servers():
+            thread = threading.Thread(target=server.serve_forever)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def serve_forever(self):
+        if self.stream_server is not None:
+            thread = threading.Thread(target=self.stream_server.serve_forever)
+            thread.daemon = True
+            thread.start()
+
+        self.server.serve_forever()
+
+    def stop(self):
+        for server in self.get_servers():
+            server.shutdown()
+            server.server_close()
+
+    def get_host(self):
+        """
+        Returns a connected JSHost which sends its calls to the stand-in
+        """
+        from ..js_host import JSHost
+
+        host = JSHost(status=self.status)
+        host.connect()
+        return host
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serves a stand-in js-host with the default functions')
+    parser.add_argument('--address', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--stream', action='store_true', help='also serve the functions over a stream server')
+    args = parser.parse_args(argv)
+
+    stand_in = StandInHost(address=args.address, port=args.port, stream=args.stream)
+
+    sys.stdout.write(json.dumps(stand_in.status) + '\n')
+    sys.stdout.flush()
+
+    try:
+        stand_in.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# Records the calls made to functions, so that the most frequent calls can be
+# replayed to warm caches before a process starts serving traffic
+
+import collections
+import json
+import threading
+from .conf import settings
+
+TraceEntry = collections.namedtuple('TraceEntry', ('name', 'hash', 'count', 'data'))
+
+
+class CallTrace(object):
+    """
+    Appends a JSON line to `path` for every call. The serialized data of a
+    call is only written the first time that its hash is seen, later calls
+    with the same hash only record the function's name and the hash
+    """
+
+    # Bounds the memory used to remember hashes. Once full, the hashes are
+    # forgotten and their data is written again when next seen
+    max_seen = 100000
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.seen = set()
+        self.file = None
+
+    def record(self, name, digest, serialized_data=None):
+        entry = {'function': name, 'hash': digest}
+
+        with self.lock:
+            if serialized_data is not None and digest not in self.seen:
+                if len(self.seen) >= self.max_seen:
+                    self.seen.clear()
+                self.seen.add(digest)
+                entry['data'] = serialized_data
+
+            if self.file is None:
+                # Unbuffered, so that each line is a single write and lines
+                # from processes sharing the file are not interleaved
+                self.file = open(self.path, 'ab', 0)
+
+            self.file.write((json.dumps(entry) + '\n').encode('utf-8'))
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+_trace = None
+_trace_lock = threading.Lock()
+
+
+def get_trace():
+    """
+    Returns the CallTrace for the TRACE_FILE setting, or None if calls are
+    not being recorded
+    """
+    global _trace
+
+    path = settings.TRACE_FILE
+    if not path:
+        return None
+
+    trace = _trace
+    if trace is None or trace.path != path:
+        with _trace_lock:
+            if _trace is None or _trace.path != path:
+                if _trace is not None:
+                    _trace.close()
+                _trace = CallTrace(path)
+            trace = _trace
+
+    return trace
+
+
+def read_trace(path):
+    """
+    Returns a list of TraceEntry tuples for the distinct calls recorded in
+    `path`, ordered from the most to the least frequent. `data` is None for
+    calls whose data was not recorded
+    """
+    counts = collections.Counter()
+    data = {}
+
+    with open(path, 'rb') as trace_file:
+        for line in trace_file:
+            try:
+                entry = json.loads(line.decode('utf-8'))
+            except ValueError:
+                # A process may have been killed mid-write
+                continue
+
+            key = (entry['function'], entry['hash'])
+            counts[key] += 1
+            if 'data' in entry:
+                data[key] = entry['data']
+
+    return [
+        TraceEntry(name, digest, count, data.get((name, digest)))
+        for (name, digest), count in counts.most_common()
+    ]
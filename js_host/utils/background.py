@@ -0,0 +1,28 @@
+import threading
+
+
+class BackgroundCall(threading.Thread):
+    """
+    Runs `func` in a separate thread. `join` returns its result or re-raises
+    its exception
+    """
+
+    def __init__(self, func, *args):
+        super(BackgroundCall, self).__init__()
+        self.daemon = True
+        self.func = func
+        self.args = args
+        self.result = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.result = self.func(*self.args)
+        except Exception as e:
+            self.error = e
+
+    def join(self, timeout=None):
+        super(BackgroundCall, self).join(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.result
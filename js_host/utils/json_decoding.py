@@ -0,0 +1,22 @@
+# Decodes JSON directly from bytes, using the fastest backend available
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(content):
+    """
+    Raises ValueError if `content` is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+
+    try:
+        return json.loads(content)
+    except TypeError:
+        # Versions of Python 3 prior to 3.6 only decode strings
+        return json.loads(content.decode('utf-8'))
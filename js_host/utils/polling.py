@@ -0,0 +1,22 @@
+import time
+
+
+def wait_for(condition, timeout, interval=0.001, max_interval=0.1):
+    """
+    Polls `condition` with an exponential backoff until it returns a truthy
+    value or `timeout` seconds have elapsed. Returns the condition's final
+    value, so callers can detect an expired deadline.
+    """
+    deadline = time.time() + timeout
+
+    while True:
+        result = condition()
+        if result:
+            return result
+
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return result
+
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
@@ -0,0 +1,5 @@
+# Calls which a user is waiting on, such as rendering a page for a request
+INTERACTIVE = 'interactive'
+
+# Bulk work which can wait, such as pre-rendering pages in a batch job
+BACKGROUND = 'background'
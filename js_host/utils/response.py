@@ -0,0 +1,40 @@
+import json
+
+
+class ReadResponse(object):
+    """
+    A response whose body has been read into memory, either from a stdio host
+    or from a streamed HTTP response. Mimics the parts of `requests.Response`
+    which functions rely on
+    """
+
+    def __init__(self, status_code, text=None, content=None, headers=None, encoding=None, elapsed=None):
+        self.status_code = status_code
+        self._text = text
+        self._content = content
+        self.headers = headers if headers is not None else {}
+        self.encoding = encoding
+        self.elapsed = elapsed
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = self._content.decode(self.encoding or 'utf-8', 'replace')
+        return self._text
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = self._text.encode('utf-8')
+        return self._content
+
+    def close(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        content = self.content
+        for i in range(0, len(content), chunk_size):
+            yield content[i:i + chunk_size]
+
+    def json(self):
+        return json.loads(self.text)
@@ -0,0 +1,133 @@
+# Watches config files and the modules that they require, and restarts the
+# hosts which use them when they change
+
+import json
+import os
+import subprocess
+import threading
+from . import log
+from .conf import settings
+from .utils import verbosity
+
+# Prints the modules loaded by a config file. Dependencies within node_modules
+# are excluded, as they rarely change and can number in the thousands
+RESOLVE_DEPENDENCIES = (
+    'var path = require("path");'
+    'require(path.resolve(process.argv[1]));'
+    'console.log(JSON.stringify(Object.keys(require.cache).filter(function(file) {'
+    '  return file.split(path.sep).indexOf("node_modules") === -1;'
+    '})));'
+)
+
+
+def resolve_config_dependencies(config_file):
+    """
+    Returns a list of the files loaded by `config_file`, or None if the
+    config file could not be loaded
+    """
+    process = subprocess.Popen(
+        (settings.get_path_to_node(), '-e', RESOLVE_DEPENDENCIES, config_file),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    stdout, stderr = process.communicate()
+
+    if process.returncode != 0:
+        return None
+
+    # Config files which print to stdout as they load corrupt the output
+    try:
+        return json.loads(stdout.decode('utf-8'))
+    except ValueError:
+        return None
+
+
+def get_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class ConfigWatcher(threading.Thread):
+    """
+    Polls the files loaded by each host's config file and restarts the hosts
+    whose files have changed. Only hosts which can be restarted - managed
+    hosts and stdio hosts - are watched
+    """
+
+    def __init__(self, hosts, interval=None):
+        super(ConfigWatcher, self).__init__()
+        self.daemon = True
+
+        self.hosts = [host for host in hosts if self.can_restart(host)]
+        self.interval = interval or settings.WATCH_INTERVAL
+        self.mtimes = {}
+        self.has_stopped = threading.Event()
+
+        # Snapshot the files before the thread starts, so that changes made
+        # immediately after starting are not missed
+        for config_file in set(self.get_config_file(host) for host in self.hosts):
+            self.mtimes[config_file] = self.snapshot(config_file)
+
+    @staticmethod
+    def can_restart(host):
+        return host.can_restart()
+
+    @staticmethod
+    def get_config_file(host):
+        return host.config_file or settings.get_config_file()
+
+    def snapshot(self, config_file, previous=None):
+        files = resolve_config_dependencies(config_file)
+
+        # If the config file is broken, continue watching the files that it
+        # previously loaded, so that a fix will be picked up
+        if files is None:
+            files = list(previous or ()) or [config_file]
+
+        return dict((path, get_mtime(path)) for path in files)
+
+    def run(self):
+        while not self.has_stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # Keep watching, as the next check may succeed
+                log.warn('Failed to check %s for changes: %s', type(self).__name__, e, event='watch_failed')
+
+    def stop(self):
+        self.has_stopped.set()
+
+    def check(self):
+        for config_file, mtimes in list(self.mtimes.items()):
+            current = dict((path, get_mtime(path)) for path in mtimes)
+            if current == mtimes:
+                continue
+
+            # The module graph may have changed along with the files
+            self.mtimes[config_file] = self.snapshot(config_file, previous=mtimes)
+
+            self.reload(config_file)
+
+    def reload(self, config_file):
+        for host in self.hosts:
+            if self.get_config_file(host) != config_file:
+                continue
+
+            log.log(
+                verbosity.PROCESS_START,
+                'Detected changes to %s, restarting %s',
+                config_file,
+                host.get_name(),
+                event='config_changed',
+                config_file=config_file,
+                host=host.get_name(),
+            )
+
+            try:
+                host.restart()
+            except Exception as e:
+                # The previous process continues to serve calls, so a broken
+                # edit should not kill the watcher
+                log.warn('Failed to restart %s: %s', host.get_name(), e, event='restart_failed', host=host.get_name())
@@ -5,6 +5,9 @@ setup(
     name='js-host',
     version=js_host.__version__,
     packages=find_packages(exclude=('examples', 'tests')),
+    package_data={
+        'js_host': ['*.js'],
+    },
     install_requires=[
         'requests>=2.5.0',
         'optional-django==0.3.0',
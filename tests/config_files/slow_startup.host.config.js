@@ -0,0 +1,7 @@
+// Blocks for longer than the tests' startup timeout
+var start = Date.now();
+while (Date.now() - start < 2000) {}
+
+module.exports = {
+	functions: {}
+};
@@ -0,0 +1,14 @@
+var fs = require('fs');
+
+module.exports = {
+	functions: {
+		write_to_stdout: function(data, done) {
+			process.stdout.write('Hello from stdout\n');
+			done(null, data.echo);
+		},
+		write_to_fd: function(data, done) {
+			fs.writeSync(1, 'Hello from file descriptor 1\n');
+			done(null, data.echo);
+		}
+	}
+};
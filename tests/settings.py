@@ -24,6 +24,8 @@ class ConfigFiles(object):
         os.path.dirname(__file__), 'config_files', 'test_manager_lifecycle.host.config.js'
     )
     JS_HOST = os.path.join(os.path.dirname(__file__), 'config_files', 'test_js_host.host.config.js')
+    STDIO_HOST = os.path.join(os.path.dirname(__file__), 'config_files', 'test_stdio_host.host.config.js')
+    SLOW_STARTUP = os.path.join(os.path.dirname(__file__), 'config_files', 'slow_startup.host.config.js')
 
 
 # When run under nose, the settings are bound in tests/__init__.py
@@ -37,6 +39,44 @@ JS_HOST = {
     'USE_MANAGER': True,
     # Prevent js-host from outputting anything
     'VERBOSITY': verbosity.SILENT,
+    # Named hosts used by the registry tests
+    'HOSTS': {
+        'stdio': {
+            'CONFIG_FILE': os.path.join('config_files', 'test_js_host.host.config.js'),
+            'USE_MANAGER': False,
+            'USE_STDIO': True,
+            'STDIO_POOL_SIZE': 1,
+            'FUNCTION_TIMEOUT': 0.2,
+        },
+        'missing_config_file': {
+            'CONFIG_FILE': os.path.join('config_files', '__non_existent_file__'),
+        },
+        'unknown_option': {
+            'CONFIG_FILE': os.path.join('config_files', 'test_js_host.host.config.js'),
+            'UNKNOWN': True,
+        },
+        # Inherits USE_MANAGER from the global settings
+        'stdio_with_manager': {
+            'CONFIG_FILE': os.path.join('config_files', 'test_js_host.host.config.js'),
+            'USE_STDIO': True,
+        },
+        'stdio_with_root_url': {
+            'CONFIG_FILE': os.path.join('config_files', 'test_js_host.host.config.js'),
+            'USE_MANAGER': False,
+            'USE_STDIO': True,
+            'ROOT_URL': 'http://127.0.0.1:30403',
+        },
+        'stdio_with_concurrency_limit': {
+            'CONFIG_FILE': os.path.join('config_files', 'test_js_host.host.config.js'),
+            'USE_MANAGER': False,
+            'USE_STDIO': True,
+            'CONCURRENCY_LIMIT': 4,
+        },
+        'root_url_with_manager': {
+            'CONFIG_FILE': os.path.join('config_files', 'test_js_host.host.config.js'),
+            'ROOT_URL': 'http://127.0.0.1:30403',
+        },
+    },
 }
 
 
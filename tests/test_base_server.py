@@ -1,4 +1,5 @@
 import unittest
+import warnings
 from js_host.base_server import BaseServer
 from js_host.bin import read_status_from_config_file
 from .settings import ConfigFiles
@@ -35,8 +36,27 @@ class TestBaseServer(unittest.TestCase):
         self.assertEqual(self.server.get_url('some/endpoint'), 'http://123.456.789.0:1234/some/endpoint')
         self.server.root_url = None
 
+    def test_reuses_a_single_session(self):
+        session = self.server.get_session()
+        self.assertIsNotNone(session)
+        self.assertIs(self.server.get_session(), session)
+
     def test_can_request_status_safely(self):
         self.assertIsNone(self.server.request_status())
 
     def test_can_check_if_running_safely(self):
-        self.assertFalse(self.server.is_running())
\ No newline at end of file
+        self.assertFalse(self.server.is_running())
+
+    def test_can_check_if_stopped_safely(self):
+        self.assertTrue(self.server.has_stopped())
+
+    def test_version_mismatches_can_be_checked_without_warnings(self):
+        status = dict(self.status, version='0.0.0')
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.assertFalse(self.server.matches_status(status, warn=False))
+            self.assertEqual(caught, [])
+
+            self.assertFalse(self.server.matches_status(status))
+            self.assertEqual(len(caught), 1)
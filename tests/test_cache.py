@@ -0,0 +1,156 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from js_host.cache import ResultCache, warm
+from js_host.exceptions import ConfigError, FunctionError, FunctionTimeout
+from js_host.function import Function
+from js_host.stdio_host import StdioHost
+from js_host.trace import read_trace
+from .settings import ConfigFiles
+from .utils import override_settings
+
+
+class TestResultCache(unittest.TestCase):
+    def test_evicts_the_least_recently_used_entries(self):
+        cache = ResultCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+
+        cache.set('c', 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_entries_expire(self):
+        cache = ResultCache(max_age=0.05)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get_metrics(), {'entries': 0, 'hits': 1, 'stale_hits': 0, 'misses': 1})
+
+
+class TestFunctionCaching(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.host = StdioHost(config_file=ConfigFiles.JS_HOST, pool_size=1)
+        cls.host.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.host.stop()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_output_is_cached_by_data(self):
+        counter = Function('counter', host=self.host, cache=ResultCache())
+
+        first = counter.call(key=1)
+        self.assertEqual(counter.call(key=1), first)
+        self.assertNotEqual(counter.call(key=2), first)
+
+    def test_calls_can_be_recorded_and_replayed(self):
+        trace_file = os.path.join(self.directory, 'trace.jsonl')
+        echo_data = Function('echo_data', host=self.host)
+
+        with override_settings(TRACE_FILE=trace_file):
+            for _ in range(3):
+                echo_data.call(foo='hot')
+            echo_data.call(foo='cold')
+
+        entries = read_trace(trace_file)
+        self.assertEqual([entry.count for entry in entries], [3, 1])
+        self.assertEqual(json.loads(entries[0].data), {'foo': 'hot'})
+
+        # Data is only recorded the first time that a call is seen
+        with open(trace_file) as lines:
+            self.assertEqual(sum('data' in json.loads(line) for line in lines), 2)
+
+        cached_echo_data = Function('echo_data', host=self.host, cache=ResultCache())
+        self.assertEqual(warm([cached_echo_data], trace_file, limit=1), 1)
+
+        key = cached_echo_data.get_cache_key(cached_echo_data.serialize_data({'foo': 'hot'}))
+        self.assertEqual(cached_echo_data.cache.get(key), '{"foo":"hot"}')
+        self.assertEqual(len(cached_echo_data.cache), 1)
+
+    def test_cached_calls_are_recorded(self):
+        trace_file = os.path.join(self.directory, 'trace.jsonl')
+        echo_data = Function('echo_data', host=self.host, cache=ResultCache())
+
+        with override_settings(TRACE_FILE=trace_file):
+            for _ in range(5):
+                echo_data.call(foo='hot')
+            for _ in range(2):
+                echo_data.call(foo='cold')
+
+        entries = read_trace(trace_file)
+        self.assertEqual([entry.count for entry in entries], [5, 2])
+        self.assertEqual(json.loads(entries[0].data), {'foo': 'hot'})
+        self.assertEqual(echo_data.cache.get_metrics()['misses'], 2)
+
+        cached_echo_data = Function('echo_data', host=self.host, cache=ResultCache())
+        self.assertEqual(warm([cached_echo_data], trace_file, limit=1), 1)
+        key = cached_echo_data.get_cache_key(cached_echo_data.serialize_data({'foo': 'hot'}))
+        self.assertEqual(cached_echo_data.cache.get(key), '{"foo":"hot"}')
+
+    def test_stale_output_is_served_while_it_is_refreshed(self):
+        counter = Function('counter', host=self.host, cache=ResultCache(max_age=0.2, stale_window=10))
+
+        first = counter.call(key='stale')
+        time.sleep(0.3)
+
+        # The stale output is returned while a single refresh is in flight
+        self.assertEqual(counter.call(key='stale'), first)
+        self.assertEqual(counter.call(key='stale'), first)
+
+        deadline = time.time() + 5
+        while counter.call(key='stale') == first and time.time() < deadline:
+            time.sleep(0.01)
+
+        refreshed = counter.call(key='stale')
+        self.assertEqual(int(refreshed), int(first) + 1)
+        self.assertEqual(counter.cache.get_metrics()['misses'], 1)
+
+    def test_errors_can_be_cached(self):
+        error = Function('error', host=self.host, error_cache=ResultCache(max_age=60))
+
+        self.assertRaises(FunctionError, error.call)
+        self.assertRaises(FunctionError, error.call_bytes)
+        self.assertEqual(error.error_cache.get_metrics()['hits'], 1)
+
+        try:
+            error.call()
+            raise Exception('A FunctionError should have been raised before this line')
+        except FunctionError as e:
+            self.assertIn('Hello from error function', str(e))
+
+    def test_cached_errors_expire(self):
+        error = Function('error', host=self.host, error_cache=ResultCache(max_age=0.2))
+
+        self.assertRaises(FunctionError, error.call)
+        self.assertRaises(FunctionError, error.call)
+        time.sleep(0.3)
+        self.assertRaises(FunctionError, error.call)
+
+        metrics = error.error_cache.get_metrics()
+        self.assertEqual(metrics['hits'], 1)
+        self.assertEqual(metrics['misses'], 2)
+
+    def test_error_caches_require_a_max_age(self):
+        self.assertRaises(ConfigError, Function, 'error', host=self.host, error_cache=ResultCache())
+
+    def test_timeouts_are_not_cached_as_errors(self):
+        async_echo = Function('async_echo', host=self.host, timeout=0.1, error_cache=ResultCache(max_age=60))
+
+        self.assertRaises(FunctionTimeout, async_echo.call, echo='foo')
+        self.assertEqual(len(async_echo.error_cache), 0)
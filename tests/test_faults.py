@@ -0,0 +1,86 @@
+import io
+import time
+import unittest
+import requests
+from js_host.exceptions import ConnectionError, FunctionError, UnexpectedResponse
+from js_host.function import Function
+from js_host.testing.faults import FaultProxy, DROP, TRUNCATE, ERROR
+from js_host.testing.stand_in import StandInHost
+from .utils import override_settings
+
+
+class TestFaults(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.stand_in = StandInHost()
+        cls.stand_in.start()
+        cls.target_url = 'http://127.0.0.1:{}'.format(cls.stand_in.status['config']['port'])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stand_in.stop()
+
+    def get_function(self, name='echo', **kwargs):
+        proxy = FaultProxy(self.target_url, **kwargs)
+        proxy.start()
+        self.addCleanup(proxy.stop)
+        return proxy, Function(name, host=proxy.get_host(self.stand_in.status))
+
+    def test_requests_are_proxied(self):
+        proxy, echo = self.get_function()
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+        self.assertEqual(proxy.faults, {None: 1})
+
+    def test_latency_is_added(self):
+        proxy, echo = self.get_function(latency=0.1)
+        start = time.time()
+        echo.call(echo='foo')
+        self.assertTrue(time.time() - start >= 0.1)
+
+    def test_dropped_connections_raise_connection_errors(self):
+        proxy, echo = self.get_function(drop_rate=1)
+        self.assertRaises(ConnectionError, echo.call, echo='foo')
+
+    def test_truncated_responses_raise_connection_errors(self):
+        proxy, echo = self.get_function(truncate_rate=1)
+        self.assertRaises(ConnectionError, echo.call, echo='x' * 100)
+
+        with override_settings(MAX_RESPONSE_SIZE=1000):
+            self.assertRaises(ConnectionError, echo.call, echo='x' * 100)
+
+        # Streamed responses are truncated while they are being read
+        self.assertRaises(ConnectionError, echo.write_to, io.BytesIO(), echo='x' * 100)
+        self.assertRaises(ConnectionError, echo.call_file, echo='x' * 100)
+
+    def test_errors_are_returned(self):
+        proxy, echo = self.get_function(error_rate=1)
+        self.assertRaises(FunctionError, echo.call, echo='foo')
+
+    def test_upstream_failures_return_gateway_errors(self):
+        proxy, sleep = self.get_function('sleep', timeout=0.1)
+
+        with self.assertRaises(UnexpectedResponse) as context:
+            sleep.call(duration=0.5)
+        self.assertIn('502', str(context.exception))
+        self.assertEqual(proxy.upstream_errors, 1)
+
+        proxy = FaultProxy('http://127.0.0.1:1')
+        proxy.start()
+        self.addCleanup(proxy.stop)
+
+        res = requests.post(proxy.get_url() + '/function/echo', data='{}')
+        self.assertEqual(res.status_code, 502)
+        self.assertEqual(proxy.upstream_errors, 1)
+
+    def test_faults_are_deterministic(self):
+        rates = dict(drop_rate=0.2, truncate_rate=0.2, error_rate=0.2)
+        proxy = FaultProxy(self.target_url, seed=1, **rates)
+        faults = [proxy.get_fault('/function/echo')[1] for i in range(100)]
+        proxy.server.server_close()
+
+        proxy = FaultProxy(self.target_url, seed=1, **rates)
+        self.assertEqual([proxy.get_fault('/function/echo')[1] for i in range(100)], faults)
+        self.assertEqual(proxy.get_fault('/status'), (0, None))
+        proxy.server.server_close()
+
+        self.assertEqual(set(faults), set([DROP, TRUNCATE, ERROR, None]))
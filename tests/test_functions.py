@@ -1,9 +1,11 @@
+import io
 import json
 import unittest
-from js_host.exceptions import ConfigError, FunctionError, FunctionTimeout
+from js_host.exceptions import ConfigError, FunctionError, FunctionTimeout, UnexpectedResponse
 from js_host.function import Function
 from js_host.bin import spawn_managed_host
 from js_host.host import host, manager
+from js_host.utils.priority import INTERACTIVE
 from .settings import ConfigFiles
 
 
@@ -21,6 +23,7 @@ class TestFunctions(unittest.TestCase):
         self.assertEqual(function.name, 'foo')
         self.assertEqual(function.host, None)
         self.assertEqual(function.timeout, None)
+        self.assertEqual(function.priority, INTERACTIVE)
 
     def test_name_is_required(self):
         self.assertRaises(ConfigError, Function)
@@ -75,6 +78,45 @@ class TestFunctions(unittest.TestCase):
         )
         self.assertEqual(self.async_echo.call(echo='foo'), 'foo')
 
+    def test_call_bytes(self):
+        self.assertEqual(self.echo.call_bytes(echo='test'), b'test')
+        self.assertRaises(FunctionError, self.echo.call_bytes)
+
+    def test_call_json(self):
+        self.assertEqual(self.echo_data.call_json(), {})
+        self.assertEqual(
+            self.echo_data.call_json(foo=1, bar=[2, 3, {'woz': 4}]),
+            {'foo': 1, 'bar': [2, 3, {'woz': 4}]}
+        )
+        self.assertRaises(UnexpectedResponse, self.echo.call_json, echo='not json')
+
+    def test_write_to(self):
+        output = io.BytesIO()
+        self.assertEqual(self.echo.write_to(output, echo='test'), 4)
+        self.assertEqual(output.getvalue(), b'test')
+        self.assertRaises(FunctionError, self.echo.write_to, io.BytesIO())
+
+    def test_call_file(self):
+        with self.echo.call_file(echo='test') as file_obj:
+            self.assertEqual(file_obj.read(), b'test')
+        self.assertRaises(FunctionError, self.echo.call_file)
+
+    def test_map(self):
+        results = list(self.echo.map([{'echo': 'foo'}, {}, {'echo': 'bar'}], concurrency=2))
+
+        self.assertEqual([kwargs for kwargs, output, error in results], [{'echo': 'foo'}, {}, {'echo': 'bar'}])
+        self.assertEqual([output for kwargs, output, error in results], ['foo', None, 'bar'])
+        self.assertIsNone(results[0][2])
+        self.assertIsInstance(results[1][2], FunctionError)
+
+    def test_map_can_yield_results_as_completed(self):
+        results = self.async_echo.map(({'echo': str(i)} for i in range(6)), concurrency=3, ordered=False)
+
+        self.assertEqual(
+            sorted(int(output) for kwargs, output, error in results),
+            list(range(6)),
+        )
+
     def test_500_errors_are_raised_as_Function_errors(self):
         self.assertRaises(FunctionError, self.error.call)
         self.assertRaises(FunctionError, self.echo.call)
@@ -0,0 +1,140 @@
+import time
+import unittest
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from js_host.exceptions import PayloadTooLarge
+from js_host.function import Function
+from js_host.http_cache import HTTPCache, parse_cache_control
+from js_host.testing.stand_in import StandInHost, StandInRequestHandler
+from .utils import BlockingManager, override_settings
+
+
+def make_response(status_code=200, content=b'output', **headers):
+    res = Response()
+    res.status_code = status_code
+    res._content = content
+    res.headers = CaseInsensitiveDict(dict((name.replace('_', '-'), value) for name, value in headers.items()))
+    return res
+
+
+class CachingRequestHandler(StandInRequestHandler):
+    def end_headers(self):
+        self.send_header('Cache-Control', 'max-age=60')
+        StandInRequestHandler.end_headers(self)
+
+
+class TestHTTPCache(unittest.TestCase):
+    def test_parse_cache_control(self):
+        self.assertEqual(
+            parse_cache_control('public, Max-Age=60, no-cache="Set-Cookie"'),
+            {'public': True, 'max-age': '60', 'no-cache': 'Set-Cookie'},
+        )
+        self.assertEqual(parse_cache_control(None), {})
+
+    def test_responses_are_fresh_for_their_max_age(self):
+        cache = HTTPCache(max_entries=10)
+        res = make_response(Cache_Control='max-age=60')
+
+        self.assertIs(cache.handle_response('key', res), res)
+        self.assertIs(cache.get('key').response, res)
+        self.assertTrue(cache.get('key').is_fresh())
+
+        cache.handle_response('aged', make_response(Cache_Control='max-age=60', Age='60'))
+        self.assertIsNone(cache.get('aged'))
+
+    def test_uncacheable_responses_are_not_stored(self):
+        cache = HTTPCache(max_entries=10)
+
+        cache.handle_response('none', make_response())
+        cache.handle_response('no-store', make_response(Cache_Control='no-store, max-age=60', ETag='"a"'))
+        cache.handle_response('error', make_response(500, Cache_Control='max-age=60'))
+
+        self.assertIsNone(cache.get('none'))
+        self.assertIsNone(cache.get('no-store'))
+        self.assertIsNone(cache.get('error'))
+
+    def test_stale_responses_are_revalidated_with_their_etag(self):
+        cache = HTTPCache(max_entries=10)
+        res = make_response(Cache_Control='no-cache', ETag='"abc"')
+        cache.handle_response('key', res)
+
+        entry = cache.get('key')
+        self.assertFalse(entry.is_fresh())
+        self.assertEqual(
+            cache.get_conditional_headers(entry, {'content-type': 'application/json'}),
+            {'content-type': 'application/json', 'If-None-Match': '"abc"'},
+        )
+
+        not_modified = make_response(304, content=b'', Cache_Control='max-age=60')
+        self.assertIs(cache.handle_response('key', not_modified, entry), res)
+        self.assertIs(cache.get('key').response, res)
+        self.assertTrue(cache.get('key').is_fresh())
+        self.assertEqual(cache.get('key').etag, '"abc"')
+
+    def test_changed_responses_replace_cached_responses(self):
+        cache = HTTPCache(max_entries=10)
+        cache.handle_response('key', make_response(ETag='"a"'))
+        entry = cache.get('key')
+
+        changed = make_response(content=b'changed', ETag='"b"', Cache_Control='max-age=60')
+        self.assertIs(cache.handle_response('key', changed, entry), changed)
+        self.assertEqual(cache.get('key').etag, '"b"')
+        self.assertTrue(cache.get('key').expires > time.time())
+
+    def test_hosts_look_up_each_call_once(self):
+        stand_in = StandInHost()
+        stand_in.start()
+
+        try:
+            host = stand_in.get_host()
+            echo = Function('echo', host=host)
+
+            with override_settings(HTTP_CACHE_SIZE=10):
+                key = host.get_cache_key('echo', echo.generate_params('{"echo": "foo"}', None))
+                host.get_http_cache().handle_response(key, make_response(Cache_Control='no-cache', ETag='"a"'))
+
+                # The stale entry is revalidated, and replaced by the new output
+                self.assertEqual(echo.call(echo='foo'), 'foo')
+                self.assertEqual(host.http_cache.entries.get_metrics()['hits'], 1)
+        finally:
+            stand_in.stop()
+
+    def test_hosts_clear_their_cache_when_restarted(self):
+        stand_in = StandInHost()
+        stand_in.start()
+
+        try:
+            host = stand_in.get_host()
+            host.manager = BlockingManager()
+            host.manager.release.set()
+
+            with override_settings(HTTP_CACHE_SIZE=10):
+                host.get_http_cache().handle_response('key', make_response(Cache_Control='max-age=60'))
+                host.restart()
+                self.assertIsNone(host.http_cache.get('key'))
+        finally:
+            stand_in.stop()
+
+    def test_responses_with_a_limited_size_are_cached(self):
+        calls = []
+
+        def output(data):
+            calls.append(data)
+            return 'x' * data['size']
+
+        stand_in = StandInHost({'output': output})
+        stand_in.server.RequestHandlerClass = CachingRequestHandler
+        stand_in.start()
+
+        try:
+            host = stand_in.get_host()
+            function = Function('output', host=host)
+
+            with override_settings(HTTP_CACHE_SIZE=10, MAX_RESPONSE_SIZE=100):
+                self.assertEqual(function.call(size=10), 'x' * 10)
+                self.assertEqual(function.call(size=10), 'x' * 10)
+                self.assertEqual(len(calls), 1)
+
+                self.assertRaises(PayloadTooLarge, function.call, size=1000)
+        finally:
+            stand_in.stop()
@@ -6,6 +6,8 @@ from requests.exceptions import ConnectionError as RequestsConnectionError
 from js_host.js_host import JSHost
 from js_host.base_server import BaseServer
 from js_host.bin import read_status_from_config_file
+from js_host.exceptions import ConfigError
+from js_host.startup import Startup
 from .utils import start_proxy, stop_proxy, start_host_process, stop_host_process
 from .settings import ConfigFiles, JS_HOST
 
@@ -43,6 +45,33 @@ class TestJSHost(unittest.TestCase):
         self.assertEqual(self.host.get_url(), 'http://127.0.0.1:30403')
         self.assertEqual(self.host.get_url('some/endpoint'), 'http://127.0.0.1:30403/some/endpoint')
 
+    def test_builds_a_function_registry_on_connect(self):
+        self.assertEqual(
+            self.host.get_function_url('echo'),
+            'http://127.0.0.1:30403/function/echo',
+        )
+        self.assertEqual(
+            sorted(self.host.functions.keys()),
+            ['async_echo', 'counter', 'echo', 'echo_data', 'error'],
+        )
+        self.assertRaises(ConfigError, self.host.get_function_url, 'missing_function')
+
+    def test_startup_connects_to_a_running_host_and_times_each_phase(self):
+        startup = Startup(config_file=ConfigFiles.JS_HOST)
+        manager, host = startup.run()
+
+        self.assertIsNone(manager)
+        self.assertTrue(host.has_connected)
+        self.assertEqual(host.get_status(), self.host.get_status())
+        self.assertEqual(list(startup.timings.keys()), ['read config', 'probe', 'connect', 'total'])
+
+    def test_startup_probes_a_root_url_while_reading_the_config(self):
+        startup = Startup(config_file=ConfigFiles.JS_HOST, root_url='http://127.0.0.1:30403')
+        manager, host = startup.run()
+
+        self.assertTrue(host.has_connected)
+        self.assertEqual(host.get_status(), self.host.get_status())
+
     def test_host_connection_lifecycle(self):
         host, process = start_host_process(port_override=0)
 
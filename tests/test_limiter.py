@@ -0,0 +1,192 @@
+import threading
+import time
+import unittest
+from js_host.exceptions import HostOverloaded
+from js_host.function import Function
+from js_host.limiter import ConcurrencyLimiter
+from js_host.testing.stand_in import StandInHost
+from js_host.utils.priority import INTERACTIVE, BACKGROUND
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+    def test_rejects_calls_beyond_the_limit_and_queue(self):
+        limiter = ConcurrencyLimiter(initial_limit=2, max_queue=0)
+
+        limiter.acquire()
+        limiter.acquire()
+        self.assertRaises(HostOverloaded, limiter.acquire)
+
+        metrics = limiter.get_metrics()
+        self.assertEqual(metrics['in_flight'], 2)
+        self.assertEqual(metrics['rejected'], 1)
+
+        limiter.release(latency=0.01)
+        limiter.acquire()
+
+    def test_queued_calls_wait_for_a_slot(self):
+        limiter = ConcurrencyLimiter(initial_limit=1, max_queue=1, queue_timeout=5)
+        limiter.acquire()
+
+        acquired = threading.Event()
+
+        def acquire():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+
+        time.sleep(0.05)
+        self.assertFalse(acquired.is_set())
+        self.assertEqual(limiter.get_metrics()['queued'], 1)
+        self.assertRaises(HostOverloaded, limiter.acquire)
+
+        limiter.release(latency=0.01)
+        thread.join()
+        self.assertTrue(acquired.is_set())
+
+    def test_queued_calls_time_out(self):
+        limiter = ConcurrencyLimiter(initial_limit=1, max_queue=1, queue_timeout=0.05)
+        limiter.acquire()
+        self.assertRaises(HostOverloaded, limiter.acquire)
+        self.assertEqual(limiter.get_metrics()['queued'], 0)
+
+    def test_limit_grows_while_latency_is_stable(self):
+        limiter = ConcurrencyLimiter(initial_limit=2, max_limit=10)
+
+        for _ in range(20):
+            limiter.acquire()
+            limiter.acquire()
+            limiter.release(latency=0.01)
+            limiter.release(latency=0.01)
+
+        self.assertGreater(limiter.get_metrics()['limit'], 2)
+
+    def test_limit_shrinks_when_latency_rises_or_calls_are_dropped(self):
+        limiter = ConcurrencyLimiter(initial_limit=10)
+
+        limiter.acquire()
+        limiter.release(latency=0.01)
+        limiter.acquire()
+        limiter.release(latency=1)
+        self.assertLess(limiter.limit, 10)
+
+        limit = limiter.limit
+        limiter.acquire()
+        limiter.release(dropped=True)
+        self.assertLess(limiter.limit, limit)
+        self.assertEqual(limiter.get_metrics()['dropped'], 1)
+
+    def test_latency_is_compared_against_the_function_called(self):
+        limiter = ConcurrencyLimiter(initial_limit=10)
+
+        for i in range(10):
+            limiter.acquire()
+            limiter.release(latency=0.01, name='cheap')
+            limiter.acquire()
+            limiter.release(latency=1, name='expensive')
+        self.assertEqual(limiter.limit, 10)
+
+        limiter.acquire()
+        limiter.release(latency=5, name='expensive')
+        self.assertLess(limiter.limit, 10)
+
+        baselines = limiter.get_metrics()['baseline_latencies']
+        self.assertEqual(sorted(baselines), ['cheap', 'expensive'])
+        self.assertLess(baselines['cheap'], baselines['expensive'])
+
+    def test_limit_never_falls_below_the_minimum(self):
+        limiter = ConcurrencyLimiter(initial_limit=2)
+
+        for _ in range(50):
+            limiter.acquire()
+            limiter.release(dropped=True)
+
+        self.assertEqual(limiter.get_metrics()['limit'], 1)
+
+    def test_reserves_capacity_for_interactive_calls(self):
+        limiter = ConcurrencyLimiter(initial_limit=4, interactive_reserve=0.5)
+
+        limiter.acquire(BACKGROUND)
+        limiter.acquire(BACKGROUND)
+        self.assertRaises(HostOverloaded, limiter.acquire, BACKGROUND)
+
+        limiter.acquire(INTERACTIVE)
+        limiter.acquire(INTERACTIVE)
+        self.assertRaises(HostOverloaded, limiter.acquire, INTERACTIVE)
+
+    def test_waiting_interactive_calls_take_precedence(self):
+        limiter = ConcurrencyLimiter(initial_limit=1, max_queue=2, queue_timeout=5)
+        limiter.acquire(INTERACTIVE)
+
+        order = []
+
+        def acquire(priority):
+            limiter.acquire(priority)
+            order.append(priority)
+            limiter.release(latency=0.01)
+
+        background = threading.Thread(target=acquire, args=(BACKGROUND,))
+        background.start()
+        time.sleep(0.05)
+
+        interactive = threading.Thread(target=acquire, args=(INTERACTIVE,))
+        interactive.start()
+        time.sleep(0.05)
+
+        self.assertEqual(limiter.get_metrics()['queued'], 2)
+        self.assertEqual(limiter.get_metrics()['queued_interactive'], 1)
+
+        limiter.release(latency=0.01)
+        background.join()
+        interactive.join()
+
+        self.assertEqual(order, [INTERACTIVE, BACKGROUND])
+
+    def test_background_calls_can_not_fill_the_queue_for_interactive_calls(self):
+        limiter = ConcurrencyLimiter(initial_limit=1, max_queue=1, queue_timeout=5)
+        limiter.acquire(INTERACTIVE)
+
+        def acquire(priority):
+            limiter.acquire(priority)
+            limiter.release(latency=0.01)
+
+        background = threading.Thread(target=acquire, args=(BACKGROUND,))
+        background.start()
+        time.sleep(0.05)
+
+        self.assertRaises(HostOverloaded, limiter.acquire, BACKGROUND)
+
+        interactive = threading.Thread(target=acquire, args=(INTERACTIVE,))
+        interactive.start()
+        time.sleep(0.05)
+
+        self.assertEqual(limiter.get_metrics()['queued_interactive'], 1)
+        self.assertEqual(limiter.get_metrics()['rejected'], 1)
+
+        limiter.release(latency=0.01)
+        background.join()
+        interactive.join()
+
+
+class TestHostLimiter(unittest.TestCase):
+    def test_calls_release_the_limiter_they_acquired(self):
+        stand_in = StandInHost()
+        stand_in.start()
+        host = stand_in.get_host()
+        host.configure(concurrency_limit=2)
+        limiter = host.limiter
+
+        sleep = Function('sleep', host=host)
+        call = threading.Thread(target=sleep.call, kwargs={'duration': 0.2})
+        call.start()
+        time.sleep(0.05)
+
+        host.configure(concurrency_limit=4)
+        call.join()
+
+        self.assertEqual(limiter.get_metrics()['in_flight'], 0)
+        self.assertEqual(host.limiter.get_metrics()['in_flight'], 0)
+        self.assertEqual(limiter.get_metrics()['completed'], 1)
+
+        stand_in.stop()
@@ -0,0 +1,128 @@
+import tempfile
+import threading
+import time
+import unittest
+from js_host.exceptions import FunctionError
+from js_host.function import Function
+from js_host.testing.load import percentile, run_load, find_saturation
+from js_host.testing.stand_in import StandInHost, DEFAULT_FUNCTIONS
+from .utils import override_settings
+
+
+class TestLoad(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        functions = dict(DEFAULT_FUNCTIONS, add=lambda data: data['a'] + data['b'])
+        cls.stand_in = StandInHost(functions)
+        cls.stand_in.start()
+        cls.host = cls.stand_in.get_host()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stand_in.stop()
+
+    def test_stand_in_serves_functions(self):
+        self.assertEqual(Function('echo', host=self.host).call(echo='foo'), 'foo')
+        self.assertEqual(Function('add', host=self.host).call(a=1, b=2), '3')
+        self.assertRaises(FunctionError, Function('error', host=self.host).call)
+
+    def test_limited_responses_are_read_in_chunks(self):
+        echo_data = Function('echo_data', host=self.host)
+
+        with override_settings(MAX_RESPONSE_SIZE=1000):
+            self.assertEqual(Function('echo', host=self.host).call(echo='foo'), 'foo')
+            self.assertEqual(echo_data.call_json(foo=[1, 2]), {'foo': [1, 2]})
+            self.assertEqual(echo_data.call_bytes(), b'{}')
+
+    def test_stand_in_serves_calls_without_persistent_connections(self):
+        self.host.persistent_connections = False
+        try:
+            self.assertEqual(Function('echo', host=self.host).call(echo='foo'), 'foo')
+        finally:
+            self.host.persistent_connections = None
+
+    def test_write_to_closes_the_response_if_writing_fails(self):
+        responses = []
+        send_function_request = self.host.send_function_request
+
+        def recording_send_function_request(*args, **kwargs):
+            res = send_function_request(*args, **kwargs)
+            responses.append(res)
+            return res
+
+        class FailingFile(object):
+            def write(self, chunk):
+                raise IOError('Disk full')
+
+        self.host.send_function_request = recording_send_function_request
+        try:
+            self.assertRaises(IOError, Function('echo', host=self.host).write_to, FailingFile(), echo='x' * 1000000)
+        finally:
+            del self.host.send_function_request
+
+        self.assertTrue(responses[0].raw.closed)
+
+    def test_large_output_is_spilled_to_disk(self):
+        echo = Function('echo', host=self.host)
+        temporary_files = []
+        TemporaryFile = tempfile.TemporaryFile
+
+        def recording_temporary_file(*args, **kwargs):
+            temporary_files.append(None)
+            return TemporaryFile(*args, **kwargs)
+
+        tempfile.TemporaryFile = recording_temporary_file
+        try:
+            with override_settings(RESPONSE_SPOOL_THRESHOLD=1000):
+                with echo.call_file(echo='foo') as file_obj:
+                    self.assertEqual(file_obj.read(), b'foo')
+                self.assertEqual(len(temporary_files), 0)
+
+                with echo.call_file(echo='x' * 10000) as file_obj:
+                    self.assertEqual(file_obj.read(), b'x' * 10000)
+                self.assertEqual(len(temporary_files), 1)
+        finally:
+            tempfile.TemporaryFile = TemporaryFile
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile(values, 1), 100)
+        self.assertEqual(percentile([], 0.5), None)
+
+    def test_run_load_reports_calls_and_errors(self):
+        echo = Function('echo', host=self.host)
+        report = run_load(lambda: echo.call(echo='foo'), duration=0.2, concurrency=2)
+
+        self.assertTrue(report.calls > 0)
+        self.assertEqual(report.error_rate, 0)
+        self.assertTrue(report.throughput > 0)
+        self.assertTrue(0 < report.get_percentiles()['p50'] <= report.get_percentiles()['max'])
+
+        error = Function('error', host=self.host)
+        report = run_load(error.call, duration=0.1, concurrency=1)
+        self.assertEqual(report.error_rate, 1)
+        self.assertEqual(report.errors, {'FunctionError': report.calls})
+
+    def test_open_loop_latency_includes_queueing(self):
+        # Calls are scheduled faster than a single thread can send them, so
+        # later calls are delayed behind earlier ones
+        report = run_load(lambda: time.sleep(0.01), duration=0.1, concurrency=1, rate=200)
+
+        self.assertEqual(report.calls, 20)
+        self.assertTrue(report.get_percentiles()['max'] >= 0.1)
+
+    def test_find_saturation(self):
+        reports, saturation = find_saturation(lambda: time.sleep(0.01), [1, 2], duration=0.2)
+        self.assertEqual([report.concurrency for report in reports], [1, 2])
+        self.assertEqual(saturation, None)
+
+        lock = threading.Lock()
+
+        def serialized():
+            with lock:
+                time.sleep(0.01)
+
+        reports, saturation = find_saturation(serialized, [1, 2], duration=0.2)
+        self.assertEqual(saturation, 1)
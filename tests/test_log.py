@@ -0,0 +1,102 @@
+import logging
+import unittest
+from js_host import log
+from js_host.exceptions import FunctionError, FunctionTimeout
+from js_host.function import Function
+from js_host.stdio_host import StdioHost
+from js_host.utils import verbosity
+from .settings import ConfigFiles
+from .utils import override_settings
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestLog(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.host = StdioHost(config_file=ConfigFiles.JS_HOST, pool_size=1)
+        cls.host.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.host.stop()
+
+    def setUp(self):
+        self.handler = RecordingHandler()
+        log.logger.addHandler(self.handler)
+        self.level = log.logger.level
+        log.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        log.logger.removeHandler(self.handler)
+        log.logger.setLevel(self.level)
+
+    def test_messages_are_gated_by_verbosity(self):
+        with override_settings(VERBOSITY=verbosity.PROCESS_START):
+            log.log(verbosity.PROCESS_START, 'Started %s', 'foo', event='host_started')
+            log.log(verbosity.PROCESS_STOP, 'Stopped %s', 'foo')
+
+        with override_settings(VERBOSITY=verbosity.SILENT):
+            log.warn('Failed')
+
+        self.assertEqual([record.getMessage() for record in self.handler.records], ['Started foo'])
+        self.assertEqual(self.handler.records[0].event, 'host_started')
+        self.assertEqual(self.handler.records[0].levelno, logging.INFO)
+
+    def test_function_calls_are_logged_as_structured_events(self):
+        echo = Function('echo', host=self.host)
+
+        with override_settings(VERBOSITY=verbosity.FUNCTION_CALL, LOG_PAYLOAD_LIMIT=10):
+            echo.call(echo='x' * 100)
+            # Payloads are truncated when the message is formatted
+            message = self.handler.records[0].getMessage()
+
+        record, = self.handler.records
+        self.assertEqual(record.levelno, logging.DEBUG)
+        self.assertEqual(record.event, 'function_call')
+        self.assertEqual(record.function, 'echo')
+        self.assertEqual(record.host, self.host.get_name())
+        self.assertEqual(record.status, 200)
+        self.assertEqual(record.bytes_sent, len('{"echo": "' + 'x' * 100 + '"}'))
+        self.assertEqual(record.bytes_received, 100)
+        self.assertEqual(record.error, None)
+        self.assertIn('{"echo": "... (102 more characters)', message)
+
+    def test_function_calls_can_be_sampled(self):
+        echo = Function('echo', host=self.host)
+
+        with override_settings(VERBOSITY=verbosity.FUNCTION_CALL, LOG_SAMPLE_RATE=0):
+            echo.call(echo='foo')
+
+        self.assertEqual(self.handler.records, [])
+
+    def test_failed_calls_are_always_logged(self):
+        error = Function('error', host=self.host)
+        timeout = Function('async_echo', host=self.host, timeout=0.001)
+
+        with override_settings(VERBOSITY=verbosity.FUNCTION_CALL, LOG_SAMPLE_RATE=0):
+            self.assertRaises(FunctionError, error.call)
+            self.assertRaises(FunctionTimeout, timeout.call, echo='foo')
+
+        error_record, timeout_record = self.handler.records
+        self.assertEqual(error_record.levelno, logging.WARNING)
+        self.assertEqual(error_record.event, 'function_call')
+        self.assertEqual(error_record.status, 500)
+        self.assertEqual(error_record.error, 'FunctionError')
+        self.assertEqual(timeout_record.status, None)
+        self.assertEqual(timeout_record.error, 'FunctionTimeout')
+
+    def test_payloads_are_truncated_lazily(self):
+        with override_settings(LOG_PAYLOAD_LIMIT=3):
+            self.assertEqual(str(log.Truncated('foo')), 'foo')
+            self.assertEqual(str(log.Truncated('foobar')), 'foo... (3 more characters)')
+
+        with override_settings(LOG_PAYLOAD_LIMIT=None):
+            self.assertEqual(str(log.Truncated('foobar')), 'foobar')
@@ -1,11 +1,12 @@
 import json
+import os
 import unittest
 import time
 from js_host.base_server import BaseServer
 from js_host.exceptions import ConnectionError
 from js_host.manager import JSHostManager
 from js_host.conf import settings
-from js_host.bin import spawn_detached_manager, spawn_managed_host, read_status_from_config_file
+from js_host.bin import spawn_detached_manager, spawn_managed_host, spawn_managed_hosts, read_status_from_config_file
 from .settings import ConfigFiles
 
 
@@ -73,10 +74,37 @@ class TestManager(unittest.TestCase):
 
         manager.stop()
 
+        # Stopping blocks until the manager's address has been released
+        self.assertTrue(manager.has_stopped())
+
         self.assertRaises(ConnectionError, manager.connect)
 
         self.assertFalse(manager.is_running())
 
+    def test_can_spawn_multiple_hosts_at_once(self):
+        host1, host2 = spawn_managed_hosts([ConfigFiles.MANAGER, ConfigFiles.NO_FUNCTIONS], self.manager)
+
+        self.assertEqual(host1.config_file, ConfigFiles.MANAGER)
+        self.assertEqual(host2.config_file, ConfigFiles.NO_FUNCTIONS)
+        self.assertNotEqual(host1.get_config()['port'], host2.get_config()['port'])
+        self.assertTrue(host1.has_connected)
+        self.assertTrue(host2.has_connected)
+
+        host1.disconnect()
+        host2.disconnect()
+
+    def test_hosts_are_stopped_if_any_host_fails_to_spawn(self):
+        missing = os.path.join(os.path.dirname(ConfigFiles.MANAGER), 'missing.host.config.js')
+
+        self.assertRaises(
+            Exception,
+            spawn_managed_hosts,
+            [ConfigFiles.BASE_SERVER, missing],
+            self.manager,
+        )
+
+        self.assertFalse(self.manager.request_host_status(ConfigFiles.BASE_SERVER)['started'])
+
     def test_managers_stop_shortly_after_the_last_host_has_disconnected(self):
         manager = spawn_detached_manager(config_file=ConfigFiles.MANAGER_LIFECYCLE)
 
@@ -0,0 +1,94 @@
+import unittest
+from js_host.exceptions import FunctionError, UnexpectedResponse
+from js_host.function import Function
+from js_host.profiling import Profiler, parse_server_timing, profiler
+from js_host.stdio_host import StdioHost
+from js_host.testing.stand_in import StandInHost
+from .settings import ConfigFiles
+from .utils import override_settings
+
+
+class TestProfiling(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.host = StdioHost(config_file=ConfigFiles.JS_HOST, pool_size=1)
+        cls.host.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.host.stop()
+
+    def setUp(self):
+        profiler.clear()
+
+    def test_parse_server_timing(self):
+        timings = parse_server_timing('queue;dur=1.5, render;desc="Render";dur=20, miss, bad;dur=x')
+        self.assertEqual(list(timings.items()), [('queue', 0.0015), ('render', 0.02)])
+        self.assertEqual(parse_server_timing(None), {})
+
+    def test_profiler_keeps_recent_profiles_and_notifies_listeners(self):
+        recent_profiler = Profiler(max_recent=2)
+        received = []
+        recent_profiler.add_listener(received.append)
+
+        for profile in ('a', 'b', 'c'):
+            recent_profiler.record(profile)
+
+        self.assertEqual(recent_profiler.get_recent(), ['b', 'c'])
+        self.assertEqual(received, ['a', 'b', 'c'])
+
+        recent_profiler.remove_listener(received.append)
+        recent_profiler.record('d')
+        self.assertEqual(len(received), 3)
+
+    def test_calls_are_profiled(self):
+        echo = Function('echo', host=self.host)
+        received = []
+        profiler.add_listener(received.append)
+
+        try:
+            with override_settings(PROFILE_CALLS=True):
+                self.assertEqual(echo.call(echo='foo'), 'foo')
+                echo.send_request(echo='bar')
+        finally:
+            profiler.remove_listener(received.append)
+
+        self.assertEqual(profiler.get_recent(), received)
+        self.assertEqual(len(received), 2)
+
+        call_profile, request_profile = received
+        self.assertEqual(list(call_profile.phases), ['serialize', 'hash', 'request', 'decode'])
+        self.assertEqual(list(request_profile.phases), ['serialize', 'hash', 'request'])
+        self.assertEqual(call_profile.host, self.host.get_name())
+        self.assertEqual(call_profile.error, None)
+        self.assertAlmostEqual(call_profile.total, sum(call_profile.phases.values()), places=6)
+
+    def test_failed_calls_are_profiled(self):
+        with override_settings(PROFILE_CALLS=True):
+            self.assertRaises(FunctionError, Function('error', host=self.host).call)
+            self.assertRaises(UnexpectedResponse, Function('echo', host=self.host).call_json, echo='foo')
+
+        error_profile, decode_profile = profiler.get_recent()
+        self.assertEqual(error_profile.error, 'FunctionError')
+        self.assertEqual(list(error_profile.phases), ['serialize', 'hash', 'request'])
+        self.assertEqual(decode_profile.error, 'UnexpectedResponse')
+        self.assertEqual(decode_profile.as_dict()['error'], 'UnexpectedResponse')
+
+    def test_time_queued_for_the_concurrency_limit_is_profiled(self):
+        stand_in = StandInHost()
+        stand_in.start()
+
+        try:
+            host = stand_in.get_host()
+            host.configure(concurrency_limit=1)
+            with override_settings(PROFILE_CALLS=True):
+                Function('echo', host=host).call(echo='foo')
+        finally:
+            stand_in.stop()
+
+        profile, = profiler.get_recent()
+        self.assertEqual(list(profile.phases), ['serialize', 'hash', 'queue', 'request', 'receive', 'decode'])
+
+    def test_calls_are_not_profiled_by_default(self):
+        Function('echo', host=self.host).call(echo='foo')
+        self.assertEqual(profiler.get_recent(), [])
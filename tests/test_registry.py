@@ -0,0 +1,108 @@
+import threading
+import unittest
+from js_host.exceptions import ConfigError, FunctionTimeout
+from js_host.function import Function
+from js_host.js_host import JSHost
+from js_host.registry import get_host, registry
+from js_host.stdio_host import StdioHost
+from js_host.testing.faults import FaultProxy
+from js_host.testing.stand_in import VERSION
+from .settings import ConfigFiles
+from .utils import override_settings, start_host_process, stop_host_process
+
+
+class TestHostRegistry(unittest.TestCase):
+    def test_hosts_are_started_lazily_and_shared(self):
+        hosts = []
+
+        def fetch_host():
+            hosts.append(get_host('stdio'))
+
+        threads = [threading.Thread(target=fetch_host) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(id(host) for host in hosts)), 1)
+        self.assertIsInstance(hosts[0], StdioHost)
+        self.assertEqual(len(hosts[0].processes), 1)
+
+    def test_functions_can_select_hosts_by_name(self):
+        echo = Function('echo', host='stdio')
+        self.assertEqual(echo.get_host(), get_host('stdio'))
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+
+    def test_hosts_can_override_the_function_timeout(self):
+        async_echo = Function('async_echo', host='stdio')
+        self.assertEqual(async_echo.get_timeout(get_host('stdio')), 0.2)
+        self.assertRaises(FunctionTimeout, async_echo.call, echo='foo')
+
+    def test_raises_config_errors_for_invalid_hosts(self):
+        self.assertRaises(ConfigError, get_host, 'undefined')
+        self.assertRaises(ConfigError, get_host, 'missing_config_file')
+        self.assertRaises(ConfigError, get_host, 'unknown_option')
+
+    def test_raises_config_errors_for_invalid_combinations_of_options(self):
+        self.assertRaises(ConfigError, get_host, 'stdio_with_manager')
+        self.assertRaises(ConfigError, get_host, 'stdio_with_root_url')
+        self.assertRaises(ConfigError, get_host, 'stdio_with_concurrency_limit')
+        self.assertRaises(ConfigError, get_host, 'root_url_with_manager')
+        self.assertNotIn('stdio_with_manager', registry.hosts)
+
+    def test_hosts_are_constructed_with_their_root_url(self):
+        status = {'version': VERSION, 'type': 'Host', 'config': {'address': '127.0.0.1', 'port': 30403}}
+        host = JSHost(status=status, root_url='http://10.0.0.5:9999')
+        self.assertEqual(host.root_url, 'http://10.0.0.5:9999')
+        self.assertEqual(host.get_url('status'), 'http://10.0.0.5:9999/status')
+
+    def test_stdio_hosts_are_configured_like_other_hosts(self):
+        host = StdioHost(config_file=ConfigFiles.JS_HOST)
+        host.configure(function_timeout=1.5, request_spool_threshold=1024)
+        self.assertEqual(host.function_timeout, 1.5)
+        self.assertEqual(host.request_spool_threshold, 1024)
+        self.assertRaises(ConfigError, host.configure, concurrency_limit=4)
+
+
+class TestHostRegistryRootUrls(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.host, cls.process = start_host_process(config_file=ConfigFiles.JS_HOST)
+        cls.host.connect()
+
+        # Each named host is reached through its own proxy, so that the calls
+        # received by each url can be counted
+        cls.proxies = [FaultProxy(cls.host.get_url()) for _ in range(2)]
+        for proxy in cls.proxies:
+            proxy.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        for proxy in cls.proxies:
+            proxy.stop()
+        stop_host_process(cls.host, cls.process)
+
+    def test_hosts_are_called_at_their_root_url(self):
+        hosts = {
+            'first_root_url': {
+                'CONFIG_FILE': ConfigFiles.JS_HOST,
+                'USE_MANAGER': False,
+                'ROOT_URL': self.proxies[0].get_url(),
+            },
+            'second_root_url': {
+                'CONFIG_FILE': ConfigFiles.JS_HOST,
+                'USE_MANAGER': False,
+                'ROOT_URL': self.proxies[1].get_url(),
+            },
+        }
+
+        with override_settings(HOSTS=hosts):
+            for name, proxy in zip(sorted(hosts), self.proxies):
+                host = get_host(name)
+                self.assertEqual(host.root_url, proxy.get_url())
+
+                echo = Function('echo', host=name)
+                self.assertEqual(echo.call(echo='foo'), 'foo')
+
+        self.assertEqual(self.proxies[0].faults[None], 1)
+        self.assertEqual(self.proxies[1].faults[None], 1)
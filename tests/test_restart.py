@@ -0,0 +1,117 @@
+import logging
+import socket
+import threading
+import time
+import unittest
+from js_host import log
+from js_host.exceptions import ProcessError
+from js_host.function import Function
+from js_host.js_host import JSHost
+from js_host.testing.stand_in import StandInHost, VERSION
+from js_host.utils import verbosity
+from js_host.utils.polling import wait_for
+from .test_log import RecordingHandler
+from .utils import BlockingManager, override_settings
+
+
+class TestRestart(unittest.TestCase):
+    def setUp(self):
+        self.stand_in = StandInHost()
+        self.stand_in.start()
+        self.manager = BlockingManager()
+        self.host = self.stand_in.get_host()
+        self.host.manager = self.manager
+
+    def tearDown(self):
+        self.manager.release.set()
+        self.stand_in.stop()
+
+    def start_restart(self):
+        thread = threading.Thread(target=self.host.restart)
+        thread.start()
+        return thread
+
+    def test_calls_are_not_held_beyond_their_timeout(self):
+        restart = self.start_restart()
+        time.sleep(0.05)
+
+        echo = Function('echo', host=self.host, timeout=0.1)
+        self.assertRaises(ProcessError, echo.call, echo='foo')
+
+        self.manager.release.set()
+        restart.join()
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+
+    def test_concurrent_restarts_run_in_turn(self):
+        restarts = [self.start_restart() for i in range(2)]
+        time.sleep(0.05)
+        self.manager.release.set()
+
+        for restart in restarts:
+            restart.join()
+
+        self.assertEqual(self.manager.restarts, 2)
+        self.assertEqual(self.manager.max_restarting, 1)
+        self.assertFalse(self.host.is_restarting)
+
+    def test_calls_in_flight_are_drained_within_the_hosts_timeout(self):
+        self.manager.release.set()
+        self.host.configure(function_timeout=0.2)
+
+        sleep = Function('sleep', host=self.host, timeout=5)
+        call = threading.Thread(target=sleep.call, kwargs={'duration': 1})
+        call.start()
+        time.sleep(0.05)
+
+        handler = RecordingHandler()
+        log.logger.addHandler(handler)
+        level = log.logger.level
+        log.logger.setLevel(logging.DEBUG)
+        try:
+            with override_settings(VERBOSITY=verbosity.PROCESS_START):
+                start = time.time()
+                self.host.restart()
+                duration = time.time() - start
+        finally:
+            log.logger.removeHandler(handler)
+            log.logger.setLevel(level)
+        call.join()
+
+        self.assertLess(duration, 0.8)
+        self.assertEqual(self.manager.restarts, 1)
+
+        events = [getattr(record, 'event', None) for record in handler.records]
+        self.assertIn('restart_drain_timeout', events)
+
+
+class TestSilentListeners(unittest.TestCase):
+    def setUp(self):
+        # Connections are queued by the listener's backlog, but never answered
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(5)
+
+        port = self.listener.getsockname()[1]
+        status = {'version': VERSION, 'type': 'Host', 'config': {'address': '127.0.0.1', 'port': port}}
+        self.host = JSHost(status=status)
+
+    def tearDown(self):
+        self.listener.close()
+
+    def test_listeners_which_do_not_respond_have_not_stopped(self):
+        with override_settings(STATUS_TIMEOUT=0.1):
+            start = time.time()
+            self.assertFalse(wait_for(self.host.has_stopped, 0.3))
+            self.assertIsNone(self.host.request_status())
+            self.assertFalse(self.host.is_running(warn=False))
+            self.assertLess(time.time() - start, 2)
+
+    def test_restarts_fail_when_the_host_does_not_respond(self):
+        manager = BlockingManager()
+        manager.release.set()
+        self.host.manager = manager
+
+        with override_settings(STATUS_TIMEOUT=0.1, STARTUP_TIMEOUT=0.3, SHUTDOWN_TIMEOUT=0.3):
+            start = time.time()
+            self.assertRaises(ProcessError, self.host.restart)
+            self.assertLess(time.time() - start, 2)
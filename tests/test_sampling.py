@@ -0,0 +1,68 @@
+import collections
+import threading
+import time
+import unittest
+from js_host.function import Function
+from js_host.sampling import (
+    SamplingProfiler, sampler, read_collapsed, write_collapsed, to_speedscope, get_top_frames,
+)
+from js_host.stdio_host import StdioHost
+from js_host.utils.six import StringIO
+from .settings import ConfigFiles
+from .utils import override_settings
+
+
+def spin(duration):
+    end = time.time() + duration
+    while time.time() < end:
+        pass
+
+
+class TestSampling(unittest.TestCase):
+    def test_only_tracked_regions_are_sampled(self):
+        profiler = SamplingProfiler(interval=0.001)
+
+        untracked = threading.Thread(target=spin, args=(0.2,))
+        untracked.start()
+
+        with profiler.track():
+            spin(0.1)
+
+        untracked.join()
+
+        stacks = profiler.get_stacks()
+        self.assertTrue(stacks)
+        for stack in stacks:
+            # Stacks begin below the frame which entered the region
+            self.assertTrue(stack[0].startswith('spin '))
+            self.assertEqual(len(stack), 1)
+
+    def test_collapsed_stacks_can_be_converted(self):
+        stacks = collections.Counter({('a', 'b'): 3, ('a', 'c'): 1, ('a',): 2})
+
+        output = StringIO()
+        write_collapsed(stacks, output)
+        self.assertEqual(output.getvalue(), 'a 2\na;b 3\na;c 1\n')
+        self.assertEqual(read_collapsed(StringIO(output.getvalue())), stacks)
+
+        profile = to_speedscope(stacks, 0.01)
+        self.assertEqual([frame['name'] for frame in profile['shared']['frames']], ['a', 'b', 'c'])
+        self.assertEqual(profile['profiles'][0]['samples'], [[0], [0, 1], [0, 2]])
+        self.assertEqual(profile['profiles'][0]['weights'], [0.02, 0.03, 0.01])
+
+        self.assertEqual(get_top_frames(stacks), [('b', 3, 3), ('a', 2, 6), ('c', 1, 1)])
+
+    def test_function_calls_can_be_sampled(self):
+        host = StdioHost(config_file=ConfigFiles.JS_HOST, pool_size=1)
+        host.start()
+        sampler.clear()
+
+        try:
+            with override_settings(SAMPLE_CALLS=True):
+                Function('async_echo', host=host).call(echo='foo')
+        finally:
+            host.stop()
+
+        stacks = sampler.get_stacks()
+        self.assertTrue(stacks)
+        self.assertTrue(all(stack[0].startswith('send_data ') for stack in stacks))
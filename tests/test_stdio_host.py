@@ -0,0 +1,199 @@
+import io
+import mmap
+import threading
+import unittest
+from js_host.exceptions import ConfigError, FunctionError, FunctionTimeout, PayloadTooLarge, ProcessError
+from js_host.function import Function
+from js_host.stdio_host import StdioHost
+from .settings import ConfigFiles
+from .utils import override_settings
+
+
+class TestStdioHost(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.host = StdioHost(config_file=ConfigFiles.JS_HOST, pool_size=2)
+        cls.host.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.host.stop()
+
+    def test_starts_a_pool_of_processes(self):
+        self.assertTrue(self.host.has_connected)
+        self.assertEqual(len(self.host.processes), 2)
+        self.assertEqual(
+            sorted(self.host.functions),
+            ['async_echo', 'counter', 'echo', 'echo_data', 'error'],
+        )
+
+    def test_can_call_functions(self):
+        echo = Function('echo', host=self.host)
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+
+        echo_data = Function('echo_data', host=self.host)
+        self.assertEqual(echo_data.call(), '{}')
+
+    def test_errors_are_raised_as_function_errors(self):
+        error = Function('error', host=self.host)
+        self.assertRaises(FunctionError, error.call)
+
+        try:
+            error.call()
+            raise Exception('A FunctionError should have been raised before this line')
+        except FunctionError as e:
+            self.assertIn('Hello from error function', str(e))
+
+    def test_can_send_spooled_data(self):
+        echo_data = Function('echo_data', host=self.host)
+        data = {'items': ['item {}'.format(i) for i in range(20000)]}
+
+        with override_settings(REQUEST_SPOOL_THRESHOLD=1024):
+            self.assertEqual(echo_data.call_json(**data), data)
+
+    def test_output_can_be_returned_as_a_file(self):
+        echo = Function('echo', host=self.host)
+
+        with override_settings(RESPONSE_SPOOL_THRESHOLD=10):
+            with echo.call_file(echo='x' * 100) as file_obj:
+                self.assertEqual(file_obj.read(), b'x' * 100)
+
+                mapped = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+                self.assertEqual(mapped[:], b'x' * 100)
+                mapped.close()
+
+    def test_spooling_can_be_enabled_for_functions_and_hosts(self):
+        data = {'items': ['item {}'.format(i) for i in range(1000)]}
+        spooled = []
+
+        def spool(function):
+            def spool_data(data, threshold):
+                spooled.append((function.name, threshold))
+                return Function.spool_data(function, data, threshold)
+            function.spool_data = spool_data
+            return function
+
+        echo_data = spool(Function('echo_data', host=self.host, request_spool_threshold=1024))
+        self.assertEqual(echo_data.call_json(**data), data)
+        self.assertEqual(spooled, [('echo_data', 1024)])
+
+        echo = spool(Function('echo', host=self.host))
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+        self.assertEqual(len(spooled), 1)
+
+        self.host.configure(request_spool_threshold=2048)
+        try:
+            self.assertEqual(echo.call(echo='foo'), 'foo')
+            self.assertEqual(echo_data.call_json(**data), data)
+        finally:
+            self.host.request_spool_threshold = None
+        self.assertEqual(spooled[1:], [('echo', 2048), ('echo_data', 1024)])
+
+    def test_spooled_data_is_closed_if_it_is_never_sent(self):
+        missing = Function('missing', host=self.host)
+        spools = []
+
+        def spool_data(data, threshold):
+            spool, size, digest = Function.spool_data(missing, data, threshold)
+            spools.append(spool)
+            return spool, size, digest
+
+        missing.spool_data = spool_data
+
+        with override_settings(REQUEST_SPOOL_THRESHOLD=1024):
+            self.assertRaises(ConfigError, missing.call, foo='bar')
+
+        self.assertTrue(spools[0].closed)
+
+    def test_payload_sizes_can_be_limited(self):
+        echo = Function('echo', host=self.host)
+
+        with override_settings(MAX_REQUEST_SIZE=100):
+            self.assertEqual(echo.call(echo='foo'), 'foo')
+            self.assertRaises(PayloadTooLarge, echo.call, echo='x' * 100)
+
+        with override_settings(MAX_REQUEST_SIZE=100, REQUEST_SPOOL_THRESHOLD=10):
+            self.assertRaises(PayloadTooLarge, echo.call, echo='x' * 100)
+
+        with override_settings(MAX_RESPONSE_SIZE=10):
+            self.assertEqual(echo.call(echo='foo'), 'foo')
+            self.assertRaises(PayloadTooLarge, echo.call, echo='x' * 11)
+            self.assertRaises(PayloadTooLarge, echo.write_to, io.BytesIO(), echo='x' * 11)
+
+    def test_missing_functions_raise_config_errors(self):
+        missing = Function('missing', host=self.host)
+        self.assertRaises(ConfigError, missing.call)
+
+    def test_can_raise_timeouts(self):
+        async_echo = Function('async_echo', host=self.host, timeout=0.2)
+        self.assertRaises(FunctionTimeout, async_echo.call, echo='foo')
+
+    def test_handles_concurrent_calls(self):
+        async_echo = Function('async_echo', host=self.host)
+        results = {}
+
+        def call(i):
+            results[i] = async_echo.call(echo=str(i))
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, dict((i, str(i)) for i in range(10)))
+
+    def test_restarts_without_failing_calls_in_flight(self):
+        host = StdioHost(config_file=ConfigFiles.JS_HOST, pool_size=1)
+        host.start()
+
+        counter = Function('counter', host=host)
+        self.assertEqual(counter.call(), '1')
+        self.assertEqual(counter.call(), '2')
+
+        async_echo = Function('async_echo', host=host)
+        results = {}
+
+        def call():
+            results['output'] = async_echo.call(echo='foo')
+
+        thread = threading.Thread(target=call)
+        thread.start()
+
+        old_process = host.processes[0]
+        host.restart()
+        thread.join()
+
+        self.assertEqual(results['output'], 'foo')
+        self.assertIsNot(host.processes[0], old_process)
+        self.assertIsNotNone(old_process.process.poll())
+        self.assertEqual(counter.call(), '1')
+
+        host.stop()
+
+    def test_output_written_to_stdout_does_not_corrupt_responses(self):
+        host = StdioHost(config_file=ConfigFiles.STDIO_HOST, pool_size=1)
+        host.start()
+
+        write_to_stdout = Function('write_to_stdout', host=host, timeout=1)
+        self.assertEqual(write_to_stdout.call(echo='foo'), 'foo')
+
+        # Writes which bypass `process.stdout` reach the stream of responses
+        write_to_fd = Function('write_to_fd', host=host, timeout=1)
+        self.assertEqual(write_to_fd.call(echo='foo'), 'foo')
+        self.assertEqual(write_to_fd.call(echo='bar'), 'bar')
+
+        host.stop()
+
+    def test_startup_is_bounded_by_the_startup_timeout(self):
+        host = StdioHost(config_file=ConfigFiles.SLOW_STARTUP, pool_size=1)
+        with override_settings(STARTUP_TIMEOUT=0.2):
+            self.assertRaises(ProcessError, host.start)
+
+    def test_raises_process_errors_once_stopped(self):
+        host = StdioHost(config_file=ConfigFiles.JS_HOST, pool_size=1)
+        host.start()
+        echo = Function('echo', host=host)
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+        host.stop()
+        self.assertRaises(ProcessError, echo.call, echo='foo')
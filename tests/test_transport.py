@@ -0,0 +1,145 @@
+import json
+import socket
+import subprocess
+import threading
+import time
+import unittest
+from js_host.conf import settings
+from js_host.exceptions import ConfigError, FunctionError, FunctionTimeout
+from js_host.function import Function
+from js_host.stdio_host import PATH_TO_STDIO_HOST
+from js_host.testing.stand_in import StandInHost
+from .settings import ConfigFiles
+from .utils import BlockingManager
+
+
+def get_unused_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestStreamTransport(unittest.TestCase):
+    def setUp(self):
+        self.stand_in = StandInHost(stream=True)
+        self.stand_in.start()
+        self.host = self.stand_in.get_host()
+        self.host.transport = 'stream'
+
+    def tearDown(self):
+        self.host.close_stream_connection()
+        self.stand_in.stop()
+
+    def test_calls_are_multiplexed_over_one_connection(self):
+        sleep = Function('sleep', host=self.host)
+        sleep.call(duration=0)
+        connection = self.host.stream_connection
+
+        threads = [threading.Thread(target=sleep.call, kwargs={'duration': 0.2}) for _ in range(10)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLess(time.time() - start, 1)
+        self.assertIs(self.host.stream_connection, connection)
+
+    def test_can_call_functions(self):
+        echo = Function('echo', host=self.host)
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+        self.assertIsNotNone(self.host.stream_connection)
+
+        error = Function('error', host=self.host)
+        self.assertRaises(FunctionError, error.call)
+
+        missing = Function('missing', host=self.host)
+        self.assertRaises(ConfigError, missing.call)
+
+    def test_closed_connections_are_replaced(self):
+        echo = Function('echo', host=self.host)
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+
+        connection = self.host.stream_connection
+        connection.stop()
+
+        self.assertEqual(echo.call(echo='bar'), 'bar')
+        self.assertIsNot(self.host.stream_connection, connection)
+
+    def test_restarts_close_the_connection(self):
+        self.host.manager = BlockingManager()
+        self.host.manager.release.set()
+
+        echo = Function('echo', host=self.host)
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+        connection = self.host.stream_connection
+
+        self.host.restart()
+        self.assertIsNone(self.host.stream_connection)
+        self.assertTrue(connection.exited)
+
+        self.assertEqual(echo.call(echo='bar'), 'bar')
+        self.assertIsNot(self.host.stream_connection, connection)
+
+    def test_timeouts_are_counted_as_dropped_calls(self):
+        self.host.configure(concurrency_limit=4)
+
+        sleep = Function('sleep', host=self.host, timeout=0.05)
+        self.assertRaises(FunctionTimeout, sleep.call, duration=0.5)
+
+        metrics = self.host.limiter.get_metrics()
+        self.assertEqual(metrics['dropped'], 1)
+        self.assertEqual(metrics['in_flight'], 0)
+
+    def test_defaults_to_http(self):
+        host = self.stand_in.get_host()
+        self.assertEqual(host.get_transport(), settings.TRANSPORT)
+        self.assertEqual(host.get_transport(), 'http')
+
+        echo = Function('echo', host=host)
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+        self.assertIsNone(host.stream_connection)
+
+    def test_falls_back_to_http_without_a_stream_server(self):
+        stand_in = StandInHost()
+        stand_in.start()
+        host = stand_in.get_host()
+        host.transport = 'stream'
+
+        echo = Function('echo', host=host)
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+        self.assertTrue(host.stream_unavailable)
+
+        stand_in.status['config']['streamPort'] = get_unused_port()
+        host = stand_in.get_host()
+        host.transport = 'stream'
+
+        echo = Function('echo', host=host)
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+        self.assertTrue(host.stream_unavailable)
+
+        stand_in.stop()
+
+    def test_can_call_a_node_stream_server(self):
+        process = subprocess.Popen(
+            (settings.get_path_to_node(), PATH_TO_STDIO_HOST, ConfigFiles.JS_HOST, '--port', '0'),
+            stdout=subprocess.PIPE,
+        )
+        status = json.loads(process.stdout.readline().decode('utf-8'))
+
+        self.stand_in.status['config']['streamPort'] = status['port']
+        host = self.stand_in.get_host()
+        host.transport = 'stream'
+
+        echo = Function('echo', host=host)
+        self.assertEqual(echo.call(echo='foo'), 'foo')
+        self.assertEqual(host.stream_connection.functions, frozenset(status['functions']))
+
+        error = Function('error', host=host)
+        self.assertRaises(FunctionError, error.call)
+
+        host.close_stream_connection()
+        process.kill()
+        process.wait()
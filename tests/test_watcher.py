@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from js_host.function import Function
+from js_host.testing.stand_in import StandInHost
+from js_host.stdio_host import StdioHost
+from js_host.watcher import ConfigWatcher, resolve_config_dependencies
+from .settings import ConfigFiles
+from .utils import BlockingManager
+
+
+class TestConfigWatcher(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.directory, 'host.config.js')
+        self.dependency = os.path.join(self.directory, 'greeting.js')
+
+        with open(self.config_file, 'w') as config_file:
+            config_file.write(
+                'var greeting = require("./greeting");'
+                'module.exports = {functions: {greet: function(data, cb) { cb(null, greeting); }}};'
+            )
+        self.write_dependency('hello')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_dependency(self, greeting):
+        with open(self.dependency, 'w') as dependency:
+            dependency.write('module.exports = "{}";'.format(greeting))
+
+    def test_can_resolve_the_dependencies_of_a_config_file(self):
+        self.assertEqual(
+            sorted(resolve_config_dependencies(self.config_file)),
+            sorted([self.config_file, self.dependency]),
+        )
+
+    def test_returns_none_for_broken_config_files(self):
+        self.assertIsNone(resolve_config_dependencies(ConfigFiles.MISSING))
+
+    def test_returns_none_for_config_files_which_print_to_stdout(self):
+        with open(self.config_file, 'w') as config_file:
+            config_file.write('console.log("loading"); module.exports = {functions: {}};')
+
+        self.assertIsNone(resolve_config_dependencies(self.config_file))
+
+    def test_only_watches_hosts_which_can_restart(self):
+        stand_in = StandInHost()
+        stand_in.start()
+
+        stdio_host = StdioHost(config_file=self.config_file)
+        unmanaged_host = stand_in.get_host()
+        managed_host = stand_in.get_host()
+        managed_host.manager = BlockingManager()
+
+        watcher = ConfigWatcher([stdio_host, unmanaged_host, managed_host])
+        self.assertEqual(watcher.hosts, [stdio_host, managed_host])
+
+        stand_in.stop()
+
+    def test_continues_watching_if_a_check_fails(self):
+        watcher = ConfigWatcher([], interval=0.01)
+        checks = []
+
+        def check():
+            checks.append(None)
+            raise Exception('Failed check')
+
+        watcher.check = check
+        watcher.start()
+
+        for _ in range(100):
+            if len(checks) > 1:
+                break
+            time.sleep(0.01)
+
+        watcher.stop()
+        watcher.join()
+        self.assertGreater(len(checks), 1)
+
+    def test_restarts_hosts_when_dependencies_change(self):
+        host = StdioHost(config_file=self.config_file, pool_size=1)
+        host.start()
+
+        greet = Function('greet', host=host)
+        self.assertEqual(greet.call(), 'hello')
+
+        watcher = ConfigWatcher([host], interval=0.05)
+        watcher.start()
+
+        # Ensure that the change is visible to filesystems with coarse mtimes
+        time.sleep(1)
+        self.write_dependency('goodbye')
+
+        for _ in range(100):
+            if greet.call() == 'goodbye':
+                break
+            time.sleep(0.05)
+
+        self.assertEqual(greet.call(), 'goodbye')
+
+        watcher.stop()
+        host.stop()
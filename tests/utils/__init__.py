@@ -2,6 +2,8 @@ import os
 import subprocess
 import json
 import atexit
+import contextlib
+import threading
 from js_host.js_host import JSHost
 from js_host.conf import settings
 from js_host.utils import verbosity
@@ -81,4 +83,42 @@ def stop_host_process(host, process):
     if host.is_running():
         process.kill()
         if settings.VERBOSITY >= verbosity.VERBOSE:
-            print('Stopped {}'.format(host.get_name()))
\ No newline at end of file
+            print('Stopped {}'.format(host.get_name()))
+
+
+@contextlib.contextmanager
+def override_settings(**overrides):
+    # Settings can only be configured once, so their attributes are replaced directly
+    previous = dict((name, getattr(settings, name)) for name in overrides)
+    for name, value in overrides.items():
+        object.__setattr__(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            object.__setattr__(settings, name, value)
+
+
+class BlockingManager(object):
+    """
+    Holds each restart until `release` is set, recording how many restarts
+    ran at once
+    """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.restarting = 0
+        self.max_restarting = 0
+        self.restarts = 0
+
+    def restart_host(self, config_file, timeout=None):
+        with self.lock:
+            self.restarting += 1
+            self.max_restarting = max(self.max_restarting, self.restarting)
+
+        self.release.wait(5)
+
+        with self.lock:
+            self.restarting -= 1
+            self.restarts += 1